@@ -1,9 +1,11 @@
 from room import Room
 from player import Player
 from world import World
+from traversal import find_traversal_path
+from validator import validate_traversal
 
 import random
-from ast import literal_eval
+import sys
 
 # Load world
 world = World()
@@ -16,35 +18,34 @@ world = World()
 # map_file = "maps/test_loop_fork.txt"
 map_file = "maps/main_maze.txt"
 
-# Loads the map into a dictionary
-room_graph=literal_eval(open(map_file, "r").read())
-world.load_graph(room_graph)
+# Loads the map. Big maps load much faster once converted to the
+# .rooms format with map_format.py.
+world.load_map(map_file)
 
-# Print an ASCII map
-world.print_rooms()
+# Print an ASCII map (skip it with --no-map)
+if "--no-map" not in sys.argv:
+    world.print_rooms()
 
 player = Player(world.starting_room)
 
 # Fill this out with directions to walk
 # traversal_path = ['n', 'n']
-traversal_path = []
+traversal_path = find_traversal_path(world, time_budget=1.0)
 
 
 
 # TRAVERSAL TEST
-visited_rooms = set()
+result = validate_traversal(world, traversal_path)
 player.current_room = world.starting_room
-visited_rooms.add(player.current_room)
 
-for move in traversal_path:
-    player.travel(move)
-    visited_rooms.add(player.current_room)
-
-if len(visited_rooms) == len(room_graph):
-    print(f"TESTS PASSED: {len(traversal_path)} moves, {len(visited_rooms)} rooms visited")
+if result.complete:
+    print(f"TESTS PASSED: {len(traversal_path)} moves, {result.visited} rooms visited")
+elif result.error_index is not None:
+    print("TESTS FAILED: INVALID MOVE")
+    print(f"Move {result.error_index} ({traversal_path[result.error_index]!r}) is not possible")
 else:
     print("TESTS FAILED: INCOMPLETE TRAVERSAL")
-    print(f"{len(room_graph) - len(visited_rooms)} unvisited rooms")
+    print(f"{len(world.rooms) - result.visited} unvisited rooms")
 
 
 
@@ -0,0 +1,131 @@
+"""
+Shortest-path tables between the rooms of a World.
+"""
+from array import array
+from collections import OrderedDict, deque
+from map_format import DIRECTIONS, OPPOSITES
+
+
+class RoomDistances:
+
+    """
+    Distance and next-direction tables built from a World's exit table.
+
+    Each source room gets two arrays with one entry per room: the number of
+    moves to that room (-1 if unreachable), and the index in DIRECTIONS of
+    the first move to make (-1 if none). Tables are built the first time a
+    source is asked about and then kept, unless max_sources is given, in
+    which case only the max_sources most recently used tables are kept.
+    """
+    def __init__(self, exits, max_sources=None):
+        self.exits = exits
+        self.num_rooms = len(exits) // len(DIRECTIONS)
+        self.max_sources = max_sources
+        # source -> (distances, first directions), least recently used first
+        self.tables = OrderedDict()
+
+    def _build(self, source):
+        exits = self.exits
+        distances = array('i', [-1]) * self.num_rooms
+        first_directions = array('b', [-1]) * self.num_rooms
+        distances[source] = 0
+        queue = deque([source])
+        while queue:
+            room = queue.popleft()
+            distance = distances[room] + 1
+            first = first_directions[room]
+            for direction in range(len(DIRECTIONS)):
+                neighbor = exits[room * 4 + direction]
+                if neighbor >= 0 and distances[neighbor] < 0:
+                    distances[neighbor] = distance
+                    # Rooms next to the source are reached by going
+                    # straight there; the rest inherit the first move
+                    first_directions[neighbor] = direction if room == source else first
+                    queue.append(neighbor)
+        return distances, first_directions
+
+    def table(self, source):
+        """
+        Return the (distances, first directions) arrays for source.
+        """
+        tables = self.tables
+        if source in tables:
+            tables.move_to_end(source)
+            return tables[source]
+        if self.max_sources is not None and len(tables) >= self.max_sources:
+            # Drop the least recently used table
+            tables.popitem(last=False)
+        tables[source] = self._build(source)
+        return tables[source]
+
+    def build_all(self):
+        """
+        Build the tables for every room up front.
+        """
+        for source in range(self.num_rooms):
+            self.table(source)
+
+    def __getstate__(self):
+        # Workers in a process pool rebuild what they need themselves
+        return {'exits': self.exits, 'num_rooms': self.num_rooms,
+                'max_sources': self.max_sources, 'tables': OrderedDict()}
+
+    def distance(self, source, destination):
+        """
+        Return the number of moves from source to destination, or -1.
+        """
+        return self.table(source)[0][destination]
+
+    def next_direction(self, source, destination):
+        """
+        Return the first move ('n', 's', 'e' or 'w') on a shortest route
+        from source to destination, or None.
+        """
+        direction = self.table(source)[1][destination]
+        return DIRECTIONS[direction] if direction >= 0 else None
+
+    def route(self, source, destination):
+        """
+        Return the direction indexes of a shortest route from source to
+        destination, or None if there isn't one.
+        """
+        distances = self.table(source)[0]
+        if distances[destination] < 0:
+            return None
+        exits = self.exits
+        # Walk back from the destination, always to a room one move
+        # closer to the source. Exits go both ways, so the way back
+        # through an exit is the opposite direction.
+        moves = []
+        room = destination
+        while room != source:
+            for direction in range(len(DIRECTIONS)):
+                neighbor = exits[room * 4 + direction]
+                if neighbor >= 0 and distances[neighbor] == distances[room] - 1:
+                    moves.append(OPPOSITES[direction])
+                    room = neighbor
+                    break
+        moves.reverse()
+        return moves
+
+    def nearest(self, source, room_ids, rng=None):
+        """
+        Return whichever of room_ids is fewest moves from source, or None
+        if none can be reached. Ties go to the first one, or a random one
+        if rng is given.
+        """
+        distances = self.table(source)[0]
+        best_distance = -1
+        best = []
+        for room_id in room_ids:
+            distance = distances[room_id]
+            if distance < 0:
+                continue
+            if best_distance < 0 or distance < best_distance:
+                best_distance = distance
+                best = [room_id]
+            elif distance == best_distance and rng is not None:
+                best.append(room_id)
+        if not best:
+            return None
+        return best[0] if rng is None else rng.choice(best)
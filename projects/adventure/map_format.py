@@ -0,0 +1,121 @@
+"""
+Read and write adventure maps.
+
+Every room is stored as a record of seven integers:
+    (room id, x, y, north id, south id, east id, west id)
+where a missing exit is -1. Three formats are supported, picked by the
+file extension:
+
+    .txt    the original maps/*.txt files (a Python dictionary literal)
+    .jsonl  one JSON list per line, one line per room
+    .rooms  the records packed as native 32-bit integers after a short
+            header; these are memory-mapped rather than parsed
+
+Usage: python map_format.py maps/main_maze.txt maps/main_maze.rooms
+"""
+import json
+import mmap
+import sys
+from array import array
+from ast import literal_eval
+
+DIRECTIONS = ('n', 's', 'e', 'w')
+# Index of the opposite direction for each index in DIRECTIONS
+OPPOSITES = tuple(DIRECTIONS.index(d) for d in ('s', 'n', 'w', 'e'))
+RECORD_SIZE = 3 + len(DIRECTIONS)
+BINARY_HEADER = b'ROOMS\x00\x00\x01'
+
+
+def room_graph_to_records(room_graph):
+    """
+    Turn a {room_id: [(x, y), {direction: room_id}]} dictionary into records.
+    """
+    for room_id, ((x, y), exits) in room_graph.items():
+        yield (room_id, x, y, *(exits.get(direction, -1) for direction in DIRECTIONS))
+
+
+def read_txt(map_file):
+    """
+    Read one of the original maps/*.txt files as records.
+    """
+    with open(map_file, 'r') as f:
+        room_graph = literal_eval(f.read())
+    return room_graph_to_records(room_graph)
+
+
+def read_jsonl(map_file):
+    """
+    Stream records from a JSON lines map, one room at a time.
+    """
+    with open(map_file, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield tuple(json.loads(line))
+
+
+def write_jsonl(records, map_file):
+    with open(map_file, 'w') as f:
+        for record in records:
+            f.write(json.dumps(list(record)))
+            f.write('\n')
+
+
+def read_binary(map_file):
+    """
+    Stream records from a packed .rooms map.
+
+    The file is memory-mapped, so only the pages actually read are loaded.
+    """
+    with open(map_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped[:len(BINARY_HEADER)] != BINARY_HEADER:
+                raise ValueError(f'{map_file} is not a packed room map')
+            if (len(mapped) - len(BINARY_HEADER)) % (RECORD_SIZE * 4) != 0:
+                raise ValueError(f'{map_file} is truncated or has a partial record')
+            values = memoryview(mapped)[len(BINARY_HEADER):].cast('i')
+            try:
+                for start in range(0, len(values), RECORD_SIZE):
+                    yield tuple(values[start:start + RECORD_SIZE])
+            finally:
+                # The mmap can't close while a view of it is still alive
+                values.release()
+
+
+def write_binary(records, map_file):
+    with open(map_file, 'wb') as f:
+        f.write(BINARY_HEADER)
+        for record in records:
+            array('i', record).tofile(f)
+
+
+READERS = {'.txt': read_txt, '.jsonl': read_jsonl, '.rooms': read_binary}
+WRITERS = {'.jsonl': write_jsonl, '.rooms': write_binary}
+
+
+def _extension(map_file, formats):
+    for extension in formats:
+        if str(map_file).endswith(extension):
+            return extension
+    raise ValueError(f'Unknown map format for {map_file}; expected one of {", ".join(formats)}')
+
+
+def read_map(map_file):
+    """
+    Return the records of any supported map file.
+    """
+    return READERS[_extension(map_file, READERS)](map_file)
+
+
+def convert_map(source_file, destination_file):
+    """
+    Copy a map into another format, e.g. a .txt map into a .rooms map.
+    """
+    writer = WRITERS[_extension(destination_file, WRITERS)]
+    writer(read_map(source_file), destination_file)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+    convert_map(sys.argv[1], sys.argv[2])
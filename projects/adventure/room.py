@@ -1,16 +1,36 @@
 # Implement a class to hold room information. This should have name and
 # description attributes.
 class Room:
+    # No per-room __dict__; big maps have millions of these
+    __slots__ = ('id', '_name', '_description', 'n_to', 's_to', 'e_to', 'w_to', 'x', 'y')
     def __init__(self, name, description, id=0, x=None, y=None):
+        # A name or description of None is generated from the id and
+        # coordinates the first time it's asked for
         self.id = id
-        self.name = name
-        self.description = description
+        self._name = name
+        self._description = description
         self.n_to = None
         self.s_to = None
         self.e_to = None
         self.w_to = None
         self.x = x
         self.y = y
+    @property
+    def name(self):
+        if self._name is None:
+            return f"Room {self.id}"
+        return self._name
+    @name.setter
+    def name(self, name):
+        self._name = name
+    @property
+    def description(self):
+        if self._description is None:
+            return f"({self.x},{self.y})"
+        return self._description
+    @description.setter
+    def description(self, description):
+        self._description = description
     def __str__(self):
         return f"\n-------------------\n\n{self.name}\n\n   {self.description}\n\n{self.get_exits_string()}\n"
     def print_room_description(self, player):
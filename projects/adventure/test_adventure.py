@@ -0,0 +1,183 @@
+import glob
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from map_format import DIRECTIONS, convert_map, read_map
+from distances import RoomDistances
+from traversal import find_traversal_path, greedy_walk, tree_walk
+from validator import pack_moves, validate_traversal
+from world import World, MAX_DISTANCE_TABLES
+
+MAPS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'maps')
+MAP_FILES = sorted(glob.glob(os.path.join(MAPS, '*.txt')))
+
+
+class MapFormatTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trips(self):
+        for map_file in MAP_FILES:
+            records = list(read_map(map_file))
+            name = os.path.splitext(os.path.basename(map_file))[0]
+            for extension in ('.jsonl', '.rooms'):
+                converted = os.path.join(self.directory, name + extension)
+                convert_map(map_file, converted)
+                self.assertListEqual(list(read_map(converted)), records)
+
+    def test_worlds_match(self):
+        map_file = os.path.join(MAPS, 'main_maze.txt')
+        converted = os.path.join(self.directory, 'main_maze.rooms')
+        convert_map(map_file, converted)
+        world = World()
+        world.load_map(map_file)
+        binary_world = World(compact=True)
+        binary_world.load_map(converted)
+        self.assertEqual(binary_world.exits, world.exits)
+        self.assertEqual(len(binary_world.rooms), len(world.rooms))
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, read_map, 'maps/main_maze.csv')
+        bad_file = os.path.join(self.directory, 'bad.rooms')
+        with open(bad_file, 'wb') as f:
+            f.write(b'not a room map')
+        self.assertRaises(ValueError, list, read_map(bad_file))
+        # Cutting any number of bytes off a good file must be caught, not
+        # read as a short last record
+        good_file = os.path.join(self.directory, 'test_cross.rooms')
+        convert_map(os.path.join(MAPS, 'test_cross.txt'), good_file)
+        with open(good_file, 'rb') as f:
+            data = f.read()
+        for cut in (1, 4, 8, 12):
+            with open(bad_file, 'wb') as f:
+                f.write(data[:-cut])
+            self.assertRaises(ValueError, list, read_map(bad_file))
+            self.assertRaises(ValueError, World(compact=True).load_map, bad_file)
+
+
+class RenderTest(unittest.TestCase):
+
+    def test_window(self):
+        world = World()
+        world.load_map(os.path.join(MAPS, 'test_cross.txt'))
+        stream = io.StringIO()
+        world.print_rooms(stream, center=(3, 5), radius=0)
+        self.assertEqual(stream.getvalue(), '#####\n#  |  #\n#-000-#\n#  |  #\n\n#####\n')
+        self.assertRaises(ValueError, world.print_rooms, stream, center=(3, 5))
+        self.assertRaises(ValueError, world.print_rooms, stream, radius=2)
+
+
+class TraversalTest(unittest.TestCase):
+
+    def test_every_map(self):
+        for map_file in MAP_FILES:
+            for compact in (False, True):
+                world = World(compact=compact)
+                world.load_map(map_file)
+                moves = find_traversal_path(world, time_budget=0.05, seed=1)
+                result = validate_traversal(world, moves)
+                self.assertTrue(result.complete, map_file)
+                self.assertEqual(result.visited, len(world.rooms))
+
+    def test_processes(self):
+        world = World()
+        world.load_map(os.path.join(MAPS, 'main_maze.txt'))
+        moves = find_traversal_path(world, time_budget=0.2, processes=2, seed=1)
+        self.assertTrue(validate_traversal(world, moves).complete)
+        self.assertLess(len(moves), 1000)
+
+    def test_walks(self):
+        world = World()
+        world.load_map(os.path.join(MAPS, 'test_cross.txt'))
+        # Four arms of two rooms: three walked there and back, one not
+        self.assertEqual(len(tree_walk(world.exits)), 3 * 4 + 2)
+        moves = [DIRECTIONS[direction] for direction in greedy_walk(world.exits)]
+        self.assertTrue(validate_traversal(world, moves).complete)
+
+
+class DistancesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.world = World()
+        self.world.load_map(os.path.join(MAPS, 'test_loop.txt'))
+        self.distances = RoomDistances(self.world.exits)
+
+    def test_distance(self):
+        self.assertEqual(self.distances.distance(0, 0), 0)
+        # The short way round the loop
+        self.assertEqual(self.distances.distance(0, 11), 3)
+        self.assertEqual(self.distances.distance(2, 4), 4)
+        self.assertEqual(self.distances.distance(10, 0), 4)
+        self.assertEqual(self.distances.next_direction(0, 4), 'e')
+        self.assertIsNone(self.distances.next_direction(4, 4))
+
+    def test_route(self):
+        self.assertListEqual([DIRECTIONS[d] for d in self.distances.route(0, 11)], ['s', 's', 'w'])
+        self.assertListEqual(self.distances.route(3, 3), [])
+        for source in range(12):
+            for destination in range(12):
+                moves = self.distances.route(source, destination)
+                self.assertEqual(len(moves), self.distances.distance(source, destination))
+                result = validate_traversal(self.world, [DIRECTIONS[d] for d in moves], start=source)
+                self.assertIsNone(result.error_index)
+        rooms = self.world.rooms
+        self.assertListEqual(self.world.find_route(rooms[2], rooms[4]), ['s', 's', 'e', 'e'])
+
+    def test_nearest(self):
+        self.assertEqual(self.distances.nearest(0, [2, 11, 9]), 2)
+        self.assertIsNone(self.distances.nearest(0, []))
+
+    def test_bounded_tables(self):
+        distances = RoomDistances(self.world.exits, max_sources=3)
+        for source in range(12):
+            distances.table(source)
+        self.assertListEqual(list(distances.tables), [9, 10, 11])
+        # A source that keeps being used stays, however many others come and go
+        for source in range(12):
+            distances.distance(0, 5)
+            distances.table(source)
+        self.assertListEqual(list(distances.tables), [10, 0, 11])
+        hot_table = distances.table(0)
+        distances.table(1)
+        self.assertIs(distances.table(0), hot_table)
+        self.assertEqual(self.world.distances.max_sources, MAX_DISTANCE_TABLES)
+
+
+class ValidatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.world = World()
+        self.world.load_map(os.path.join(MAPS, 'test_cross.txt'))
+
+    def test_complete(self):
+        moves = ['n', 'n', 's', 's', 's', 's', 'n', 'n', 'e', 'e', 'w', 'w', 'w', 'w']
+        result = validate_traversal(self.world, moves)
+        self.assertEqual(result, (True, 9, None))
+        self.assertEqual(validate_traversal(self.world, ''.join(moves)), result)
+        self.assertEqual(validate_traversal(self.world, pack_moves(moves)), result)
+
+    def test_incomplete(self):
+        self.assertEqual(validate_traversal(self.world, ['n', 'n', 's']), (False, 3, None))
+        self.assertEqual(validate_traversal(self.world, []), (False, 1, None))
+
+    def test_impossible_move(self):
+        # Room 2 is the end of the north arm
+        result = validate_traversal(self.world, ['n', 'n', 'n', 's'])
+        self.assertEqual(result, (False, 3, 2))
+        self.assertEqual(validate_traversal(self.world, 'e', start=4).error_index, 0)
+
+    def test_unknown_move(self):
+        self.assertEqual(validate_traversal(self.world, ['n', 'x', 's']).error_index, 1)
+        # Multi-character moves are reported rather than merged into valid ones
+        self.assertEqual(validate_traversal(self.world, ['n', 'ns']).error_index, 1)
+        self.assertEqual(validate_traversal(self.world, ['n', 'é']).error_index, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,209 @@
+"""
+Find short walks that visit every room of a World.
+
+Everything here works on the world's integer exit table (World.exits), so
+walks can be searched for in worker processes without sending Room objects.
+
+Usage: python traversal.py [map_file] [time_budget_seconds]
+"""
+import multiprocessing
+import random
+import sys
+import time
+from collections import deque
+from map_format import DIRECTIONS, OPPOSITES
+
+
+def _num_rooms(exits):
+    return len(exits) // len(DIRECTIONS)
+
+
+def _degree(exits, room):
+    return sum(1 for neighbor in exits[room * 4:room * 4 + 4] if neighbor >= 0)
+
+
+def _path_to_nearest(exits, start, visited, rng=None):
+    """
+    Breadth-first search from start to the closest unvisited room.
+
+    Returns the list of direction indexes to get there, or None if every
+    reachable room has been visited. With rng, ties are broken randomly.
+    """
+    parents = {start: None}
+    queue = deque([start])
+    while queue:
+        room = queue.popleft()
+        if not visited[room]:
+            # Follow the parents back to start to get the directions
+            moves = []
+            while parents[room] is not None:
+                room, direction = parents[room]
+                moves.append(direction)
+            moves.reverse()
+            return moves
+        directions = list(range(len(DIRECTIONS)))
+        if rng is not None:
+            rng.shuffle(directions)
+        for direction in directions:
+            neighbor = exits[room * 4 + direction]
+            if neighbor >= 0 and neighbor not in parents:
+                parents[neighbor] = (room, direction)
+                queue.append(neighbor)
+    return None
+
+
+def greedy_walk(exits, start=0, rng=None):
+    """
+    Walk depth-first into unvisited rooms, and when stuck, walk to the
+    nearest unvisited room.
+
+    Unvisited dead ends are always entered first, since they only cost the
+    step back out. Other choices are made in DIRECTIONS order, or randomly
+    if rng is given. Returns a list of direction indexes.
+    """
+    visited = bytearray(_num_rooms(exits))
+    visited[start] = 1
+    remaining = _num_rooms(exits) - 1
+    moves = []
+    room = start
+    while remaining > 0:
+        choices = []
+        for direction in range(len(DIRECTIONS)):
+            neighbor = exits[room * 4 + direction]
+            if neighbor >= 0 and not visited[neighbor]:
+                choices.append(direction)
+        if choices:
+            dead_ends = [direction for direction in choices
+                         if _degree(exits, exits[room * 4 + direction]) == 1]
+            if dead_ends:
+                choices = dead_ends
+            direction = choices[0] if rng is None else rng.choice(choices)
+            room = exits[room * 4 + direction]
+            moves.append(direction)
+        else:
+            # The search stops at the first unvisited room, which is
+            # usually close by, so it rarely looks at the whole map
+            path = _path_to_nearest(exits, room, visited, rng)
+            if path is None:
+                # Whatever is left can't be reached from here
+                break
+            for direction in path:
+                room = exits[room * 4 + direction]
+            moves.extend(path)
+        visited[room] = 1
+        remaining -= 1
+    return moves
+
+
+def tree_walk(exits, start=0):
+    """
+    Walk a breadth-first spanning tree from start, entering each room's
+    shallower subtrees first so that the deepest branch is left for last
+    and never has to be walked back out of.
+
+    On a map without loops this is the shortest possible walk.
+    Returns a list of direction indexes.
+    """
+    num_rooms = _num_rooms(exits)
+    # Build the tree
+    children = [[] for _ in range(num_rooms)]
+    seen = bytearray(num_rooms)
+    seen[start] = 1
+    order = [start]
+    queue = deque([start])
+    while queue:
+        room = queue.popleft()
+        for direction in range(len(DIRECTIONS)):
+            neighbor = exits[room * 4 + direction]
+            if neighbor >= 0 and not seen[neighbor]:
+                seen[neighbor] = 1
+                children[room].append((direction, neighbor))
+                order.append(neighbor)
+                queue.append(neighbor)
+
+    # Height of each subtree, children before parents
+    height = [0] * num_rooms
+    for room in reversed(order):
+        for _, child in children[room]:
+            height[room] = max(height[room], height[child] + 1)
+    for room in order:
+        children[room].sort(key=lambda child: height[child[1]])
+
+    # Walk the tree, stepping back after each subtree
+    moves = []
+    stack = [(None, iter(children[start]))]
+    while stack:
+        entry_direction, branches = stack[-1]
+        for direction, child in branches:
+            moves.append(direction)
+            stack.append((direction, iter(children[child])))
+            break
+        else:
+            stack.pop()
+            if entry_direction is not None:
+                # Step back to the parent: the opposite of the way in
+                moves.append(OPPOSITES[entry_direction])
+
+    # Drop the walk back from the last room we hadn't seen before
+    visited = bytearray(num_rooms)
+    visited[start] = 1
+    last_new = 0
+    room = start
+    for i, direction in enumerate(moves):
+        room = exits[room * 4 + direction]
+        if not visited[room]:
+            visited[room] = 1
+            last_new = i + 1
+    return moves[:last_new]
+
+
+def _random_restarts(exits, start, seed, deadline):
+    """
+    Run randomized greedy walks until deadline and return the shortest.
+    """
+    rng = random.Random(seed)
+    best = greedy_walk(exits, start, rng)
+    while time.monotonic() < deadline:
+        moves = greedy_walk(exits, start, rng)
+        if len(moves) < len(best):
+            best = moves
+    return best
+
+
+def _worker_random_restarts(args):
+    return _random_restarts(*args)
+
+
+def find_traversal_path(world, time_budget=1.0, processes=None, seed=None):
+    """
+    Return a short list of moves ('n', 's', 'e', 'w') that visits every
+    room in world, starting from world.starting_room.
+
+    Tries the greedy and tree walks, then spends time_budget seconds on
+    randomized greedy restarts, spread over processes worker processes
+    if given, and returns the shortest walk found.
+    """
+    exits = world.exits
+    start = world.starting_room.id
+    deadline = time.monotonic() + time_budget
+    candidates = [greedy_walk(exits, start), tree_walk(exits, start)]
+    if time_budget > 0:
+        if processes is None:
+            candidates.append(_random_restarts(exits, start, seed, deadline))
+        else:
+            base_seed = random.Random(seed).randrange(2 ** 32)
+            tasks = [(exits, start, base_seed + worker, deadline) for worker in range(processes)]
+            with multiprocessing.Pool(processes) as pool:
+                candidates.extend(pool.map(_worker_random_restarts, tasks))
+    best = min(candidates, key=len)
+    return [DIRECTIONS[direction] for direction in best]
+
+
+if __name__ == '__main__':
+    from world import World
+    world = World(compact=True)
+    world.load_map(sys.argv[1] if len(sys.argv) > 1 else 'maps/main_maze.txt')
+    time_budget = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    path = find_traversal_path(world, time_budget, processes=multiprocessing.cpu_count())
+    print(f'{len(path)} moves')
+    print(''.join(path))
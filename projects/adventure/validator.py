@@ -0,0 +1,56 @@
+"""
+Check traversal paths against a World without moving a Player around.
+"""
+from collections import namedtuple
+from map_format import DIRECTIONS
+
+# complete: every room was visited and every move was valid
+# visited: how many different rooms were visited, counting the start
+# error_index: index of the first move that isn't possible, or None
+TraversalResult = namedtuple('TraversalResult', ['complete', 'visited', 'error_index'])
+
+# Maps the bytes b'n', b's', b'e', b'w' to their index in DIRECTIONS
+# and every other byte to 255
+_MOVE_CODES = bytes(DIRECTIONS.index(chr(byte)) if chr(byte) in DIRECTIONS else 255
+                    for byte in range(256))
+
+
+def pack_moves(moves):
+    """
+    Pack a list of moves like ['n', 's'] (or a string 'ns') into bytes b'ns'.
+    """
+    if isinstance(moves, (bytes, bytearray)):
+        return bytes(moves)
+    if not isinstance(moves, str):
+        if any(len(move) != 1 for move in moves):
+            # Make sure a bad move is reported rather than merged away
+            moves = ''.join(move if len(move) == 1 else '?' for move in moves)
+        else:
+            moves = ''.join(moves)
+    return moves.encode('ascii', errors='replace')
+
+
+def validate_traversal(world, moves, start=None):
+    """
+    Follow moves through world from start (a room id, or the world's
+    starting room) and return a TraversalResult.
+
+    moves can be a list of 'n'/'s'/'e'/'w' strings, a string, or packed
+    bytes from pack_moves. Stops at the first move that can't be made.
+    """
+    exits = world.exits
+    room = world.starting_room.id if start is None else start
+    codes = pack_moves(moves).translate(_MOVE_CODES)
+    visited = bytearray(len(exits) // len(DIRECTIONS))
+    visited[room] = 1
+    count = 1
+    for index, code in enumerate(codes):
+        if code == 255:
+            return TraversalResult(False, count, index)
+        room = exits[room * 4 + code]
+        if room < 0:
+            return TraversalResult(False, count, index)
+        if not visited[room]:
+            visited[room] = 1
+            count += 1
+    return TraversalResult(count == len(world.rooms), count, None)
@@ -1,89 +1,284 @@
 from room import Room
+from map_format import DIRECTIONS, OPPOSITES, read_map, room_graph_to_records
+from distances import RoomDistances
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from weakref import WeakValueDictionary
 import random
 import math
+import sys
+
+# How many rooms' distance tables World.distances keeps at once. Each
+# table has an int and a byte per room, so keeping one for every room of
+# a big map would take gigabytes.
+MAX_DISTANCE_TABLES = 64
+
+
+def _exit_property(direction):
+    # Reads and writes go straight to the world's exit table
+    def get(room):
+        neighbor_id = room._world.exits[room.id * 4 + direction]
+        return room._world.rooms[neighbor_id] if neighbor_id >= 0 else None
+    def set(room, neighbor):
+        room._world.exits[room.id * 4 + direction] = -1 if neighbor is None else neighbor.id
+    return property(get, set)
+
+
+class CompactRoom(Room):
+    # A Room whose exits and coordinates live in its World's arrays
+    __slots__ = ('_world', '__weakref__')
+    def __init__(self, world, room_id):
+        self._world = world
+        self.id = room_id
+        self._name = None
+        self._description = None
+    n_to = _exit_property(DIRECTIONS.index('n'))
+    s_to = _exit_property(DIRECTIONS.index('s'))
+    e_to = _exit_property(DIRECTIONS.index('e'))
+    w_to = _exit_property(DIRECTIONS.index('w'))
+    @property
+    def x(self):
+        return self._world.room_x[self.id]
+    @property
+    def y(self):
+        return self._world.room_y[self.id]
+
+
+class CompactRooms(Mapping):
+
+    """
+    Read-only room id -> Room mapping for World(compact=True).
+
+    Room objects are only made when they are looked up, and are kept only
+    as long as something else refers to them.
+    """
+    def __init__(self, world):
+        self.world = world
+        self.count = 0
+        self._made = WeakValueDictionary()
+
+    def __getitem__(self, room_id):
+        room = self._made.get(room_id)
+        if room is None:
+            if room_id not in self:
+                raise KeyError(room_id)
+            room = self._made[room_id] = CompactRoom(self.world, room_id)
+        return room
+
+    def __contains__(self, room_id):
+        has_room = self.world.has_room
+        return isinstance(room_id, int) and 0 <= room_id < len(has_room) and has_room[room_id] == 1
+
+    def __iter__(self):
+        has_room = self.world.has_room
+        return (room_id for room_id in range(len(has_room)) if has_room[room_id])
+
+    def __len__(self):
+        return self.count
+
 
 class World:
-    def __init__(self):
+    def __init__(self, compact=False):
+        # In compact mode there are no Room objects until they are asked
+        # for, and no dense room_grid or (x, y) dictionary. Coordinates
+        # are kept in arrays indexed by room id, and rooms are found by
+        # coordinates with a binary search over sorted position keys.
+        self.compact = compact
         self.starting_room = None
         self.rooms = {}
         self.room_grid = []
         self.grid_size = 0
+        # (x, y) -> room id, only for coordinates that have a room
+        self.room_coords = {}
+        # Compact mode only: coordinates and whether each id is a room
+        self.room_x = array('i')
+        self.room_y = array('i')
+        self.has_room = bytearray()
+        # Compact mode only: y * grid_size + x of each room, sorted,
+        # and the id of the room at each of those positions
+        self._position_keys = array('q')
+        self._position_ids = array('i')
+        # exits[room_id * 4 + DIRECTIONS.index(d)] is the id of the room
+        # in direction d, or -1
+        self.exits = array('i')
+        # Shortest-path tables, built per source room as needed
+        self.distances = RoomDistances(self.exits, MAX_DISTANCE_TABLES)
     def load_graph(self, room_graph):
-        num_rooms = len(room_graph)
-        rooms = [None] * num_rooms
+        self.load_records(room_graph_to_records(room_graph))
+
+    def load_map(self, map_file):
+        """
+        Load a map file in any format map_format can read.
+        """
+        self.load_records(read_map(map_file))
+
+    def load_records(self, records):
+        """
+        Load rooms from (id, x, y, n, s, e, w) records, where -1 means no exit.
+        """
+        compact = self.compact
+        self.rooms = CompactRooms(self) if compact else {}
+        self.room_coords = {}
+        room_x = array('i')
+        room_y = array('i')
+        has_room = bytearray()
+        # Filled in both ways, so a one-sided exit connects both rooms
+        exits = array('i')
         grid_size = 1
-        for i in range(0, num_rooms):
-            x = room_graph[i][0][0]
-            grid_size = max(grid_size, room_graph[i][0][0], room_graph[i][0][1])
-            self.rooms[i] = Room(f"Room {i}", f"({room_graph[i][0][0]},{room_graph[i][0][1]})",i, room_graph[i][0][0], room_graph[i][0][1])
-        self.room_grid = []
+        for room_id, x, y, *neighbor_ids in records:
+            grid_size = max(grid_size, x, y)
+            if compact:
+                if len(has_room) <= room_id:
+                    grow = room_id + 1 - len(has_room)
+                    has_room.extend(bytes(grow))
+                    room_x.extend([0] * grow)
+                    room_y.extend([0] * grow)
+                if not has_room[room_id]:
+                    has_room[room_id] = 1
+                    self.rooms.count += 1
+                room_x[room_id] = x
+                room_y[room_id] = y
+            else:
+                # Names and descriptions are generated lazily by Room
+                self.rooms[room_id] = Room(None, None, room_id, x, y)
+                self.room_coords[(x, y)] = room_id
+            if len(exits) < (room_id + 1) * 4:
+                exits.extend([-1] * ((room_id + 1) * 4 - len(exits)))
+            for direction, neighbor_id in enumerate(neighbor_ids):
+                if neighbor_id >= 0:
+                    if len(exits) < (neighbor_id + 1) * 4:
+                        exits.extend([-1] * ((neighbor_id + 1) * 4 - len(exits)))
+                    exits[room_id * 4 + direction] = neighbor_id
+                    exits[neighbor_id * 4 + OPPOSITES[direction]] = room_id
+        self.exits = exits
+        self.distances = RoomDistances(exits, MAX_DISTANCE_TABLES)
         grid_size += 1
         self.grid_size = grid_size
+        self.room_grid = []
+        if compact:
+            # Every exit target needs an entry, even if it had no record
+            grow = len(exits) // 4 - len(has_room)
+            if grow > 0:
+                has_room.extend(bytes(grow))
+                room_x.extend([0] * grow)
+                room_y.extend([0] * grow)
+            self.room_x = room_x
+            self.room_y = room_y
+            self.has_room = has_room
+            room_ids = sorted(self.rooms, key=lambda room_id: room_y[room_id] * grid_size + room_x[room_id])
+            self._position_ids = array('i', room_ids)
+            self._position_keys = array('q', [room_y[room_id] * grid_size + room_x[room_id]
+                                              for room_id in room_ids])
+            self.starting_room = self.rooms[0]
+            return
         for i in range(0, grid_size):
             self.room_grid.append([None] * grid_size)
-        for room_id in room_graph:
-            room = self.rooms[room_id]
+        rooms = self.rooms
+        for room_id, room in rooms.items():
             self.room_grid[room.x][room.y] = room
-            if 'n' in room_graph[room_id][1]:
-                self.rooms[room_id].connect_rooms('n', self.rooms[room_graph[room_id][1]['n']])
-            if 's' in room_graph[room_id][1]:
-                self.rooms[room_id].connect_rooms('s', self.rooms[room_graph[room_id][1]['s']])
-            if 'e' in room_graph[room_id][1]:
-                self.rooms[room_id].connect_rooms('e', self.rooms[room_graph[room_id][1]['e']])
-            if 'w' in room_graph[room_id][1]:
-                self.rooms[room_id].connect_rooms('w', self.rooms[room_graph[room_id][1]['w']])
+            base = room_id * 4
+            n, s, e, w = exits[base:base + 4]
+            room.n_to = rooms[n] if n >= 0 else None
+            room.s_to = rooms[s] if s >= 0 else None
+            room.e_to = rooms[e] if e >= 0 else None
+            room.w_to = rooms[w] if w >= 0 else None
         self.starting_room = self.rooms[0]
 
-    def print_rooms(self):
-        rotated_room_grid = []
-        for i in range(0, len(self.room_grid)):
-            rotated_room_grid.append([None] * len(self.room_grid))
-        for i in range(len(self.room_grid)):
-            for j in range(len(self.room_grid[0])):
-                rotated_room_grid[len(self.room_grid[0]) - j - 1][i] = self.room_grid[i][j]
-        print("#####")
-        str = ""
-        for row in rotated_room_grid:
-            all_null = True
-            for room in row:
-                if room is not None:
-                    all_null = False
-                    break
-            if all_null:
-                continue
-            # PRINT NORTH CONNECTION ROW
-            str += "#"
-            for room in row:
-                if room is not None and room.n_to is not None:
-                    str += "  |  "
-                else:
-                    str += "     "
-            str += "#\n"
-            # PRINT ROOM ROW
-            str += "#"
-            for room in row:
-                if room is not None and room.w_to is not None:
-                    str += "-"
-                else:
-                    str += " "
-                if room is not None:
-                    str += f"{room.id}".zfill(3)
-                else:
-                    str += "   "
-                if room is not None and room.e_to is not None:
-                    str += "-"
-                else:
-                    str += " "
-            str += "#\n"
-            # PRINT SOUTH CONNECTION ROW
-            str += "#"
-            for room in row:
-                if room is not None and room.s_to is not None:
-                    str += "  |  "
-                else:
-                    str += "     "
-            str += "#\n"
-        print(str)
-        print("#####")
+    def build_distance_tables(self):
+        """
+        Build the distance and next-direction tables for every room now,
+        instead of the first time each room is routed from, and keep them
+        all. This takes memory proportional to the number of rooms squared.
+        """
+        self.distances = RoomDistances(self.exits)
+        self.distances.build_all()
+
+    def find_route(self, from_room, to_room):
+        """
+        Return the moves of a shortest route between two rooms, or None.
+        """
+        moves = self.distances.route(from_room.id, to_room.id)
+        return None if moves is None else [DIRECTIONS[direction] for direction in moves]
+
+    def get_room_id_at(self, x, y):
+        """
+        Return the id of the room at (x, y), or None.
+        """
+        if not self.compact:
+            return self.room_coords.get((x, y))
+        if not (0 <= x < self.grid_size and 0 <= y < self.grid_size):
+            return None
+        key = y * self.grid_size + x
+        i = bisect_left(self._position_keys, key)
+        if i < len(self._position_keys) and self._position_keys[i] == key:
+            return self._position_ids[i]
+        return None
 
+    def get_room_at(self, x, y):
+        """
+        Return the room at (x, y), or None.
+        """
+        room_id = self.get_room_id_at(x, y)
+        return None if room_id is None else self.rooms[room_id]
 
+    def print_rooms(self, stream=None, center=None, radius=None):
+        """
+        Print an ASCII map of the rooms to stream (stdout by default).
+
+        Give center=(x, y) and radius to only draw the rooms within
+        radius columns and rows of that point.
+        """
+        if (center is None) != (radius is None):
+            raise ValueError('center and radius must be given together')
+        if stream is None:
+            stream = sys.stdout
+        stream.write("#####\n")
+        self.render_rooms(stream, center, radius)
+        stream.write("\n#####\n")
+
+    def render_rooms(self, stream, center=None, radius=None):
+        """
+        Write the rows of the ASCII map to stream, one row at a time.
+        """
+        if (center is None) != (radius is None):
+            raise ValueError('center and radius must be given together')
+        if center is None:
+            min_x, max_x = 0, self.grid_size - 1
+            min_y, max_y = 0, self.grid_size - 1
+        else:
+            min_x = max(center[0] - radius, 0)
+            max_x = min(center[0] + radius, self.grid_size - 1)
+            min_y = max(center[1] - radius, 0)
+            max_y = min(center[1] + radius, self.grid_size - 1)
+        xs = range(min_x, max_x + 1)
+        exits = self.exits
+        n, s, e, w = (DIRECTIONS.index(d) for d in 'nsew')
+        # Rows run from the top (highest y) down; columns left to right.
+        # Works from room ids and the exit table, so no Room objects are
+        # needed in compact mode.
+        for y in range(max_y, min_y - 1, -1):
+            row = [self.get_room_id_at(x, y) for x in xs]
+            if all(room_id is None for room_id in row):
+                continue
+            north = ["#"]
+            middle = ["#"]
+            south = ["#"]
+            for room_id in row:
+                if room_id is None:
+                    north.append("     ")
+                    middle.append("     ")
+                    south.append("     ")
+                    continue
+                base = room_id * 4
+                north.append("  |  " if exits[base + n] >= 0 else "     ")
+                middle.append("-" if exits[base + w] >= 0 else " ")
+                middle.append(f"{room_id}".zfill(3))
+                middle.append("-" if exits[base + e] >= 0 else " ")
+                south.append("  |  " if exits[base + s] >= 0 else "     ")
+            north.append("#\n")
+            middle.append("#\n")
+            south.append("#\n")
+            stream.write("".join(north))
+            stream.write("".join(middle))
+            stream.write("".join(south))
@@ -1,76 +1,210 @@
 import sys
 sys.path.append('../graph')
-from graph import Graph
-from util import Stack
+from util import Stack, Queue, iter_edges
+from instrumentation import instrumented
 
 
-def earliest_ancestor(ancestors, starting_node):
-    graph = Graph()
-    for ancestor in ancestors:
-        # Separate out the parent and child
-        parent = ancestor[0]
-        child = ancestor[1]
-        # Add them as vertices if they aren't vertices already
-        if parent not in graph.vertices:
-            graph.add_vertex(parent)
-        if child not in graph.vertices:
-            graph.add_vertex(child)
-        # Since we're going to be starting at the child and going
-        # backwards, we want the child to "point at" the parent.
-        # So add the edge with the child first.
-        graph.add_edge(child, parent)
-    
-    # Do a depth-first traversal, adding each full "branch" to the
-    # potential_answers list.
-    # Because several potential answers could share some of the same vertices,
-    # we don't want to keep track of "traversed vertices" like a normal traversal.
-    # This is acceptable because it's stated that there are no cycles, so this will
-    # never result in an infinite loop.
-    potential_answers = []
-    stack = Stack()
-    # Similar to a search, we'll be pushing and popping paths, not individual nodes.
-    current_path = [starting_node]
-    while current_path:
-        neighbors = graph.get_neighbors(current_path[-1])
-        # If there are neighbors, that means the branch is not yet complete,
-        # so continue the traversal.
-        if neighbors:
-            for neighbor in graph.get_neighbors(current_path[-1]):
-                new_path = current_path.copy()
-                new_path.append(neighbor)
-                stack.push(new_path)
+def _best_line(individual, parents, earliest):
+    """
+    Work out (longest line length, earliest ancestor) for individual
+    from the already known answers for each of their parents.
+    """
+    # Individuals with no parents are their own earliest ancestor
+    best = (0, individual)
+    for parent in parents:
+        depth, ancestor = earliest[parent]
+        depth += 1
+        if depth > best[0] or (depth == best[0] and ancestor < best[1]):
+            best = (depth, ancestor)
+    return best
+
+
+class AncestryIndex:
+
+    """
+    Precompute the earliest ancestor of every individual.
+
+    For each individual we store the length of their longest line of
+    ancestors and the lowest ID at the end of any line that long. A child's
+    longest line is one step longer than their parent with the longest line,
+    so everything can be worked out parents-first in a single pass.
+    """
+    def __init__(self, ancestors=()):
+        # ancestors is (parent, child) pairs, or anything util.iter_edges reads
+        self.parents = {}
+        self.children = {}
+        # The Graph the parents and children come from, for from_graph
+        self.graph = None
+        # individual -> (longest line length, earliest ancestor)
+        self.earliest = {}
+        for parent, child in iter_edges(ancestors):
+            self._add_individual(parent)
+            self._add_individual(child)
+            self.parents[child].add(parent)
+            self.children[parent].add(child)
+        self._build()
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Build an index from a Graph whose edges point from parent to child.
+
+        The index reads the graph's own adjacency sets (turning on its
+        reverse index for the parents) instead of copying them, and add
+        adds its pairs to the graph.
+        """
+        index = cls()
+        graph.enable_reverse_index()
+        index.graph = graph
+        index.parents = graph.predecessors
+        index.children = graph.vertices
+        index._build()
+        return index
+
+    def _add_individual(self, individual):
+        if individual not in self.parents:
+            if self.graph is not None:
+                self.graph.add_vertex(individual)
+            else:
+                self.parents[individual] = set()
+                self.children[individual] = set()
+
+    def _compute(self, individual):
+        return _best_line(individual, self.parents[individual], self.earliest)
+
+    @instrumented('AncestryIndex.build')
+    def _build(self, _stats=None):
+        # Kahn's algorithm: an individual is ready once all their parents are done
+        remaining_parents = {individual: len(parents)
+                             for individual, parents in self.parents.items()}
+        queue = Queue()
+        for individual, count in remaining_parents.items():
+            if count == 0:
+                queue.enqueue(individual)
+        done = 0
+        while queue.size() > 0:
+            individual = queue.dequeue()
+            self.earliest[individual] = self._compute(individual)
+            done += 1
+            for child in self.children[individual]:
+                remaining_parents[child] -= 1
+                if remaining_parents[child] == 0:
+                    queue.enqueue(child)
+            if _stats is not None:
+                _stats.expand(len(self.parents[individual]) + len(self.children[individual]),
+                              queue.size())
+        if done != len(self.parents):
+            raise ValueError('Ancestors contain a cycle')
+
+    def _is_ancestor(self, individual, descendant):
+        # Walk up from descendant looking for individual
+        seen = {descendant}
+        stack = Stack()
+        stack.push(descendant)
+        while stack.size() > 0:
+            current = stack.pop()
+            if current == individual:
+                return True
+            for parent in self.parents[current]:
+                if parent not in seen:
+                    seen.add(parent)
+                    stack.push(parent)
+        return False
+
+    def add(self, parent, child):
+        """
+        Record a new parent/child pair and update everyone affected.
+        """
+        self._add_individual(parent)
+        self._add_individual(child)
+        if parent not in self.earliest:
+            self.earliest[parent] = (0, parent)
+        if child not in self.earliest:
+            self.earliest[child] = (0, child)
+        if self._is_ancestor(child, parent):
+            raise ValueError(f'Adding {parent} as a parent of {child} would create a cycle')
+        if self.graph is not None:
+            self.graph.add_edge(parent, child)
         else:
-            # If there are no neighbors, we've hit the end of the branch,
-            # so append it to potential_answers.
-            potential_answers.append(current_path)
-        current_path = stack.pop()
-
-    #print('Potential answers:', potential_answers)
-
-    # Now, make a list of the lengths of each branch in potential_answers,
-    # and find the max length.
-    lengths = [len(family_branch) for family_branch in potential_answers]
-    max_len = max(lengths)
-    # If the max length is 1, then the traversal ended immediately; i.e.,
-    # the individual in question has no parents recorded. So per instructions,
-    # return -1.
-    if max_len == 1:
-        return -1
-    # Otherwise, find all the potential answers with length equal to the max length,
-    # and append them to "new_answers".
-    new_answers = []
-    for i in range(len(lengths)):
-        if lengths[i] == max_len:
-            new_answers.append(potential_answers[i])
-
-    #print('New answers:', new_answers)
-
-    # Finally, check the last value--i.e., the earliest ancestor--in each branch.
-    # Per instructions, return the value with the lowest numeric ID.
-    final_answer = new_answers[0][-1]
-    for family_branch in new_answers[1:]:
-        answer = family_branch[-1]
-        if answer < final_answer:
-            final_answer = answer
-
-    return final_answer
+            self.parents[child].add(parent)
+            self.children[parent].add(child)
+
+        # Only the child and their descendants can change, and we can
+        # stop going down any line where nothing changed.
+        stack = Stack()
+        stack.push(child)
+        while stack.size() > 0:
+            individual = stack.pop()
+            best = self._compute(individual)
+            if best != self.earliest[individual]:
+                self.earliest[individual] = best
+                for grandchild in self.children[individual]:
+                    stack.push(grandchild)
+
+    def earliest_ancestor(self, starting_node):
+        """
+        Return the earliest ancestor of starting_node, or -1 if they have no parents.
+        """
+        try:
+            depth, ancestor = self.earliest[starting_node]
+        except KeyError:
+            raise KeyError(f'Vertex {starting_node} not found') from None
+        return -1 if depth == 0 else ancestor
+
+
+def earliest_ancestor(ancestors, starting_node):
+    # Build the whole index in one pass over the ancestors and look up
+    # the answer. To answer many questions about the same ancestors,
+    # build an AncestryIndex once and reuse it.
+    return AncestryIndex(ancestors).earliest_ancestor(starting_node)
+
+
+@instrumented('earliest_ancestors')
+def earliest_ancestors(ancestors, starting_nodes, _stats=None):
+    """
+    Return a dictionary mapping each of starting_nodes to its earliest
+    ancestor (or -1), building the reversed graph only once.
+
+    Unlike AncestryIndex, only the ancestors of the starting nodes are
+    ever looked at, and each of them only once: their answers are
+    remembered and shared between starting nodes with common ancestors.
+    """
+    parents = {}
+    for parent, child in ancestors:
+        if parent not in parents:
+            parents[parent] = []
+        if child not in parents:
+            parents[child] = []
+        parents[child].append(parent)
+
+    earliest = {}
+    in_progress = set()
+    answers = {}
+    for starting_node in starting_nodes:
+        if starting_node not in parents:
+            raise KeyError(f'Vertex {starting_node} not found')
+        # Depth-first, but an individual is only worked out after all
+        # their parents, so each stack entry records whether its parents
+        # have been pushed yet.
+        stack = Stack()
+        stack.push((starting_node, False))
+        while stack.size() > 0:
+            individual, parents_done = stack.pop()
+            if individual in earliest:
+                continue
+            if parents_done:
+                earliest[individual] = _best_line(individual, parents[individual], earliest)
+                in_progress.discard(individual)
+                if _stats is not None:
+                    _stats.expand(len(parents[individual]), stack.size())
+            elif individual in in_progress:
+                raise ValueError('Ancestors contain a cycle')
+            else:
+                in_progress.add(individual)
+                stack.push((individual, True))
+                for parent in parents[individual]:
+                    if parent not in earliest:
+                        stack.push((parent, False))
+        depth, ancestor = earliest[starting_node]
+        answers[starting_node] = -1 if depth == 0 else ancestor
+    return answers
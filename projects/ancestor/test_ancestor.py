@@ -1,5 +1,6 @@
 import unittest
-from ancestor import earliest_ancestor
+from ancestor import earliest_ancestor, earliest_ancestors, AncestryIndex
+from graph import Graph
 
 class Test(unittest.TestCase):
 
@@ -26,5 +27,46 @@ class Test(unittest.TestCase):
         self.assertEqual(earliest_ancestor(test_ancestors, 10), -1)
         self.assertEqual(earliest_ancestor(test_ancestors, 11), -1)
 
+    def test_ancestry_index(self):
+        test_ancestors = [(1, 3), (2, 3), (3, 6), (5, 6), (5, 7), (4, 5), (4, 8), (8, 9), (11, 8), (10, 1)]
+        index = AncestryIndex(test_ancestors)
+        for individual in range(1, 12):
+            self.assertEqual(index.earliest_ancestor(individual),
+                             earliest_ancestor(test_ancestors, individual))
+        self.assertRaises(KeyError, index.earliest_ancestor, 12)
+
+        graph = Graph.from_edge_list(test_ancestors)
+        graph_index = AncestryIndex.from_graph(graph)
+        self.assertDictEqual(graph_index.earliest, index.earliest)
+        # Descendants and ancestors can both be walked on the same graph
+        self.assertCountEqual(list(graph.iter_bft(4))[1:], [5, 6, 7, 8, 9])
+        self.assertCountEqual(list(graph.iter_bft(6, reverse=True))[1:], [1, 2, 3, 4, 5, 10])
+        # The index uses the graph's own sets, and add goes through the graph
+        self.assertIs(graph_index.children, graph.vertices)
+        self.assertIs(graph_index.parents, graph.predecessors)
+        graph_index.add(12, 10)
+        self.assertEqual(graph_index.earliest_ancestor(6), 12)
+        self.assertIn(10, graph.get_neighbors(12))
+        self.assertIn(12, graph.get_predecessors(10))
+        self.assertTrue(graph.is_connected(12, 9))
+
+    def test_ancestry_index_add(self):
+        index = AncestryIndex([(1, 3), (2, 3), (3, 6), (5, 6), (5, 7), (4, 5), (4, 8), (8, 9), (11, 8), (10, 1)])
+        index.add(12, 10)
+        self.assertEqual(index.earliest_ancestor(6), 12)
+        self.assertEqual(index.earliest_ancestor(9), 4)
+        index.add(13, 12)
+        index.add(0, 4)
+        self.assertEqual(index.earliest_ancestor(9), 0)
+        self.assertEqual(index.earliest_ancestor(6), 13)
+        self.assertRaises(ValueError, index.add, 6, 13)
+        self.assertRaises(ValueError, AncestryIndex, [(1, 2), (2, 1)])
+
+    def test_earliest_ancestors(self):
+        test_ancestors = [(1, 3), (2, 3), (3, 6), (5, 6), (5, 7), (4, 5), (4, 8), (8, 9), (11, 8), (10, 1)]
+        answers = earliest_ancestors(test_ancestors, [6, 9, 7, 3, 10])
+        self.assertDictEqual(answers, {6: 10, 9: 4, 7: 4, 3: 10, 10: -1})
+        self.assertRaises(KeyError, earliest_ancestors, test_ancestors, [12])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,215 @@
+"""
+Benchmark every traversal and project entry point on seeded inputs.
+
+Usage:
+    python benchmark.py [--scale small|medium|large] [--repeat N]
+                        [--only NAME ...] [--save FILE] [--baseline FILE]
+                        [--tolerance RATIO]
+
+Each benchmark reports its best time over --repeat runs, its throughput
+(work items per second; what counts as an item is listed per benchmark)
+and the peak memory allocated during one extra run. With --baseline, each
+time is compared against a JSON file written earlier with --save, and the
+exit status is 1 if anything got slower than --tolerance times the baseline.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# Every project lives in its own directory and imports its neighbours by name
+HERE = os.path.dirname(os.path.abspath(__file__))
+for project in ('graph', 'social', 'ancestor', 'adventure'):
+    sys.path.append(os.path.join(HERE, '..', project))
+
+from graph import Graph
+from social import SocialGraph
+from ancestor import earliest_ancestor
+from islands import find_islands
+from world import World
+
+# Number of vertices / users / individuals / grid side / rooms per scale
+SCALES = {
+    'small': {'vertices': 2000, 'users': 500, 'individuals': 2000, 'grid': 100, 'rooms': 2500},
+    'medium': {'vertices': 20000, 'users': 2000, 'individuals': 20000, 'grid': 300, 'rooms': 10000},
+    'large': {'vertices': 200000, 'users': 10000, 'individuals': 200000, 'grid': 1000, 'rooms': 90000},
+}
+SEED = 1
+
+
+def make_graph(num_vertices, avg_degree, rng):
+    graph = Graph()
+    for vertex in range(num_vertices):
+        graph.add_vertex(vertex)
+    for _ in range(num_vertices * avg_degree):
+        graph.add_edge(rng.randrange(num_vertices), rng.randrange(num_vertices))
+    return graph
+
+
+def make_ancestors(num_individuals, rng):
+    # Everyone after the first few gets up to two parents with lower IDs,
+    # so there are no cycles
+    ancestors = []
+    for child in range(10, num_individuals):
+        for parent in rng.sample(range(child), rng.randint(0, 2)):
+            ancestors.append((parent, child))
+    return ancestors
+
+
+def make_grid(side, rng):
+    return [[int(rng.random() < 0.5) for _ in range(side)] for _ in range(side)]
+
+
+def make_room_graph(num_rooms, rng):
+    """
+    Make a maze in the maps/*.txt format: a random spanning tree grown
+    across a square grid from the middle.
+    """
+    side = int(num_rooms ** 0.5)
+    steps = {'n': (0, 1), 's': (0, -1), 'e': (1, 0), 'w': (-1, 0)}
+    opposite = {'n': 's', 's': 'n', 'e': 'w', 'w': 'e'}
+    start = (side // 2, side // 2)
+    ids = {start: 0}
+    room_graph = {0: [start, {}]}
+    frontier = [start]
+    while frontier:
+        position = frontier[rng.randrange(len(frontier))]
+        options = []
+        for direction, (dx, dy) in steps.items():
+            neighbor = (position[0] + dx, position[1] + dy)
+            if 0 <= neighbor[0] < side and 0 <= neighbor[1] < side and neighbor not in ids:
+                options.append((direction, neighbor))
+        if not options:
+            frontier.remove(position)
+            continue
+        direction, neighbor = rng.choice(options)
+        room_id = len(ids)
+        ids[neighbor] = room_id
+        room_graph[room_id] = [neighbor, {opposite[direction]: ids[position]}]
+        room_graph[ids[position]][1][direction] = room_id
+        frontier.append(neighbor)
+    return room_graph
+
+
+def benchmarks(scale):
+    """
+    Return (name, work items, what an item is, function to time) for each
+    benchmark. All inputs are built here, outside the timed functions.
+    """
+    sizes = SCALES[scale]
+    rng = random.Random(SEED)
+
+    num_vertices = sizes['vertices']
+    graph = make_graph(num_vertices, 3, rng)
+    destination = rng.randrange(num_vertices)
+
+    num_users = sizes['users']
+    social_graph = SocialGraph()
+    social_graph.populate_graph(num_users, 5, seed=SEED)
+
+    num_individuals = sizes['individuals']
+    ancestors = make_ancestors(num_individuals, rng)
+
+    side = sizes['grid']
+    grid = make_grid(side, rng)
+
+    room_graph = make_room_graph(sizes['rooms'], rng)
+
+    def quietly(function, *args):
+        # bft/dft print every vertex; don't time the terminal
+        with contextlib.redirect_stdout(io.StringIO()):
+            function(*args)
+
+    return [
+        ('Graph.bft', num_vertices, 'vertex', lambda: quietly(graph.bft, 0)),
+        ('Graph.dft', num_vertices, 'vertex', lambda: quietly(graph.dft, 0)),
+        ('Graph.bfs', num_vertices, 'vertex', lambda: graph.bfs(0, destination)),
+        ('Graph.dfs', num_vertices, 'vertex', lambda: graph.dfs(0, destination)),
+        ('SocialGraph.get_all_social_paths', num_users, 'user',
+         lambda: social_graph.get_all_social_paths(1)),
+        ('SocialGraph.populate_graph', num_users * 10, 'user',
+         lambda: SocialGraph().populate_graph(num_users * 10, 5, seed=SEED)),
+        ('earliest_ancestor', len(ancestors), 'pair',
+         lambda: earliest_ancestor(ancestors, num_individuals - 1)),
+        ('find_islands', side * side, 'cell', lambda: find_islands(grid)),
+        ('World.load_graph', len(room_graph), 'room', lambda: World().load_graph(room_graph)),
+    ]
+
+
+def measure(function, repeat):
+    """
+    Return (best time in seconds, peak bytes allocated).
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    # Memory is measured separately since tracing slows everything down
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', metavar='NAME',
+                        help='only run benchmarks whose name contains one of these')
+    parser.add_argument('--save', metavar='FILE', help='write the results to a JSON file')
+    parser.add_argument('--baseline', metavar='FILE', help='compare against a saved JSON file')
+    parser.add_argument('--tolerance', type=float, default=1.2,
+                        help='slowdown ratio that counts as a regression (default 1.2)')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        if saved['scale'] != args.scale:
+            parser.error(f'{args.baseline} was saved at scale {saved["scale"]!r}, not {args.scale!r}')
+        baseline = saved['results']
+
+    results = {}
+    regressions = []
+    print(f'{"benchmark":36} {"time":>10} {"items/s":>12} {"peak":>10} {"vs baseline":>12}')
+    for name, work, unit, function in benchmarks(args.scale):
+        if args.only and not any(part in name for part in args.only):
+            continue
+        seconds, peak = measure(function, args.repeat)
+        results[name] = {'seconds': seconds, 'items': work, 'unit': unit,
+                         'items_per_second': work / seconds if seconds else None,
+                         'peak_bytes': peak}
+        comparison = ''
+        if name in baseline:
+            ratio = seconds / baseline[name]['seconds']
+            comparison = f'{ratio:.2f}x'
+            if ratio > args.tolerance:
+                comparison += ' SLOWER'
+                regressions.append(name)
+        print(f'{name:36} {seconds * 1000:8.1f}ms {work / seconds:12,.0f} '
+              f'{peak / 2 ** 20:8.1f}MB {comparison:>12}')
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'scale': args.scale, 'seed': SEED, 'python': sys.version.split()[0],
+                       'results': results}, f, indent=2)
+    if regressions:
+        print(f'Regressions: {", ".join(regressions)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
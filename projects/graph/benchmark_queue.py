@@ -0,0 +1,75 @@
+"""
+Time a breadth-first traversal with the old list-backed queue,
+the deque-backed Queue and the preallocated RingQueue.
+
+Usage: python benchmark_queue.py [num_vertices ...]
+"""
+import random
+import sys
+import time
+from util import Queue, RingQueue
+
+# Graphs bigger than this take minutes with the list-backed queue,
+# so it is skipped for them.
+LIST_QUEUE_LIMIT = 200000
+
+
+class ListQueue():
+    """The original list-backed queue, kept for comparison."""
+    def __init__(self):
+        self.queue = []
+    def enqueue(self, value):
+        self.queue.append(value)
+    def dequeue(self):
+        if self.size() > 0:
+            return self.queue.pop(0)
+        else:
+            return None
+    def size(self):
+        return len(self.queue)
+
+
+def make_graph(num_vertices, avg_degree=4, seed=0):
+    """
+    Make a random directed graph as a list of neighbor lists.
+    """
+    rng = random.Random(seed)
+    return [[rng.randrange(num_vertices) for _ in range(avg_degree)]
+            for _ in range(num_vertices)]
+
+
+def bft(adjacency, queue):
+    """
+    Breadth-first traversal from vertex 0. Returns the number of vertices visited.
+    """
+    visited = bytearray(len(adjacency))
+    visited[0] = 1
+    queue.enqueue(0)
+    count = 0
+    while queue.size() > 0:
+        vertex = queue.dequeue()
+        count += 1
+        for neighbor in adjacency[vertex]:
+            if not visited[neighbor]:
+                visited[neighbor] = 1
+                queue.enqueue(neighbor)
+    return count
+
+
+def time_bft(adjacency, queue):
+    start = time.perf_counter()
+    bft(adjacency, queue)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10**5, 10**6]
+    for num_vertices in sizes:
+        adjacency = make_graph(num_vertices)
+        print(f'{num_vertices} vertices:')
+        if num_vertices <= LIST_QUEUE_LIMIT:
+            print(f'  list queue: {time_bft(adjacency, ListQueue()):.3f}s')
+        else:
+            print('  list queue: skipped')
+        print(f'  Queue:      {time_bft(adjacency, Queue()):.3f}s')
+        print(f'  RingQueue:  {time_bft(adjacency, RingQueue(num_vertices)):.3f}s')
@@ -0,0 +1,86 @@
+"""
+Bounded cache for query results on a graph that changes now and then
+"""
+import sys
+from collections import OrderedDict
+
+
+def estimate_size(value):
+    """
+    Roughly how many bytes value takes up: the object itself plus, for
+    lists, tuples and dicts, the items directly inside it.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += sys.getsizeof(key) + sys.getsizeof(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += sys.getsizeof(item)
+    return size
+
+
+class QueryCache:
+
+    """
+    Least-recently-used cache of query results, limited by memory.
+
+    Every lookup passes the graph's current version number. As soon as it
+    differs from the version the cached results were computed at, they are
+    all thrown away, so results from before a change are never returned.
+    """
+    def __init__(self, max_bytes=64 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (value, size)
+        self.current_bytes = 0
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+        self.current_bytes = 0
+
+    def _check_version(self, version):
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    def get(self, key, version, default=None):
+        """
+        Return the value cached for key at this version, or default.
+        """
+        self._check_version(version)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, version, size=None):
+        """
+        Cache value for key, evicting the least recently used entries
+        until it fits. Values bigger than the whole cache aren't kept.
+        """
+        self._check_version(version)
+        if size is None:
+            size = estimate_size(value)
+        if key in self.entries:
+            self.current_bytes -= self.entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        while self.current_bytes + size > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+        self.entries[key] = (value, size)
+        self.current_bytes += size
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
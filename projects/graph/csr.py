@@ -0,0 +1,236 @@
+"""
+Compact, read-only graph stored in compressed sparse row (CSR) form
+"""
+from array import array
+from util import Stack, RingQueue
+
+
+class CSRGraph:
+
+    """
+    Represent a frozen graph as two flat integer arrays.
+
+    Every vertex label is mapped to an index from 0 to n-1. The neighbors of
+    the vertex with index i are stored in
+    neighbors[offsets[i]:offsets[i+1]], so the whole graph costs two machine
+    integers per vertex plus one per edge instead of a Python set per vertex.
+    """
+    def __init__(self, labels, offsets, neighbors):
+        self.labels = list(labels)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.offsets = offsets
+        self.neighbors = neighbors
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Build a CSRGraph from an existing Graph.
+        """
+        return cls.from_adjacency(graph.vertices)
+
+    @classmethod
+    def from_adjacency(cls, adjacency):
+        """
+        Build a CSRGraph from a dictionary mapping labels to neighbor sets.
+        """
+        labels = list(adjacency)
+        index = {label: i for i, label in enumerate(labels)}
+        offsets = array('q', [0])
+        neighbors = array('q')
+        for label in labels:
+            neighbors.extend(index[neighbor] for neighbor in adjacency[label])
+            offsets.append(len(neighbors))
+        return cls(labels, offsets, neighbors)
+
+    @classmethod
+    def from_edges(cls, sources, targets, labels=None):
+        """
+        Build a CSRGraph from two parallel sequences of edge endpoints.
+
+        sources[k] -> targets[k] is a directed edge. The sequences can be
+        lists, arrays or NumPy arrays. If labels is given, the endpoints are
+        vertex indexes into it; otherwise the endpoints are labels and every
+        distinct label becomes a vertex. Duplicate edges are kept once.
+        """
+        if len(sources) != len(targets):
+            raise ValueError('sources and targets must have the same length')
+        # NumPy arrays convert to plain ints far faster in bulk
+        if hasattr(sources, 'tolist'):
+            sources = sources.tolist()
+        if hasattr(targets, 'tolist'):
+            targets = targets.tolist()
+
+        if labels is None:
+            labels = []
+            index = {}
+            for label in sources:
+                if label not in index:
+                    index[label] = len(labels)
+                    labels.append(label)
+            for label in targets:
+                if label not in index:
+                    index[label] = len(labels)
+                    labels.append(label)
+            sources = [index[label] for label in sources]
+            targets = [index[label] for label in targets]
+        else:
+            labels = list(labels)
+
+        # Counting sort of the edges by source index
+        num_vertices = len(labels)
+        counts = array('q', [0]) * (num_vertices + 1)
+        for source in sources:
+            counts[source + 1] += 1
+        for i in range(num_vertices):
+            counts[i + 1] += counts[i]
+        slots = array('q', counts)
+        neighbors = array('q', [0]) * len(sources)
+        for source, target in zip(sources, targets):
+            neighbors[slots[source]] = target
+            slots[source] += 1
+
+        # Drop duplicate edges so that the result matches a Graph built
+        # from the same edges
+        offsets = array('q', [0])
+        deduped = array('q')
+        for i in range(num_vertices):
+            seen = set()
+            for target in neighbors[counts[i]:counts[i + 1]]:
+                if target not in seen:
+                    seen.add(target)
+                    deduped.append(target)
+            offsets.append(len(deduped))
+        return cls(labels, offsets, deduped)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, vertex_id):
+        return vertex_id in self.index
+
+    def _get_index(self, vertex_id):
+        # Same error as Graph.get_neighbors for a missing vertex
+        try:
+            return self.index[vertex_id]
+        except KeyError:
+            raise KeyError(f'Vertex {vertex_id} not found') from None
+
+    def _neighbor_indexes(self, i):
+        return self.neighbors[self.offsets[i]:self.offsets[i + 1]]
+
+    def _build_path(self, parents, i):
+        # Walk the parent pointers back to the start, then flip the result
+        path = []
+        while i != -1:
+            path.append(self.labels[i])
+            i = parents[i]
+        path.reverse()
+        return path
+
+    def get_neighbors(self, vertex_id):
+        """
+        Get all neighbors (edges) of a vertex as a list of labels.
+        """
+        labels = self.labels
+        return [labels[j] for j in self._neighbor_indexes(self._get_index(vertex_id))]
+
+    def to_graph(self):
+        """
+        Expand back into a regular, mutable Graph.
+        """
+        from graph import Graph
+        graph = Graph()
+        for label in self.labels:
+            graph.add_vertex(label)
+        # add_edges_from keeps the graph's component index up to date
+        labels = self.labels
+        graph.add_edges_from((label, labels[j]) for i, label in enumerate(labels)
+                             for j in self._neighbor_indexes(i))
+        return graph
+
+    def bft(self, starting_vertex):
+        """
+        Print each vertex in breadth-first order
+        beginning from starting_vertex.
+        """
+        start = self._get_index(starting_vertex)
+        visited = bytearray(len(self.labels))
+        visited[start] = 1
+        queue = RingQueue(len(self.labels))
+        queue.enqueue(start)
+        while queue.size() > 0:
+            i = queue.dequeue()
+            print(self.labels[i])
+            for j in self._neighbor_indexes(i):
+                if not visited[j]:
+                    visited[j] = 1
+                    queue.enqueue(j)
+
+    def dft(self, starting_vertex):
+        """
+        Print each vertex in depth-first order
+        beginning from starting_vertex.
+        """
+        start = self._get_index(starting_vertex)
+        visited = bytearray(len(self.labels))
+        visited[start] = 1
+        stack = Stack()
+        stack.push(start)
+        while stack.size() > 0:
+            i = stack.pop()
+            print(self.labels[i])
+            for j in self._neighbor_indexes(i):
+                if not visited[j]:
+                    visited[j] = 1
+                    stack.push(j)
+
+    def bfs(self, starting_vertex, destination_vertex):
+        """
+        Return a list containing the shortest path from
+        starting_vertex to destination_vertex in
+        breath-first order.
+
+        Returns an empty list if there is no path, which includes a path
+        from a vertex to itself, as Graph.bfs does.
+        """
+        start = self._get_index(starting_vertex)
+        destination = self._get_index(destination_vertex)
+        # parents[i] is the index we reached i from; -2 means not yet seen
+        parents = array('q', [-2]) * len(self.labels)
+        parents[start] = -1
+        queue = RingQueue(len(self.labels))
+        queue.enqueue(start)
+        while queue.size() > 0:
+            i = queue.dequeue()
+            for j in self._neighbor_indexes(i):
+                if parents[j] == -2:
+                    parents[j] = i
+                    if j == destination:
+                        return self._build_path(parents, j)
+                    queue.enqueue(j)
+        return []
+
+    def dfs(self, starting_vertex, destination_vertex):
+        """
+        Return a list containing a path from
+        starting_vertex to destination_vertex in
+        depth-first order.
+
+        Returns None if there is no path, which includes a path from a
+        vertex to itself, as Graph.dfs does.
+        """
+        start = self._get_index(starting_vertex)
+        destination = self._get_index(destination_vertex)
+        parents = array('q', [-2]) * len(self.labels)
+        parents[start] = -1
+        stack = Stack()
+        stack.push(start)
+        while stack.size() > 0:
+            i = stack.pop()
+            for j in self._neighbor_indexes(i):
+                if parents[j] == -2:
+                    parents[j] = i
+                    if j == destination:
+                        return self._build_path(parents, j)
+                    stack.push(j)
+        return None
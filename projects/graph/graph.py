@@ -1,18 +1,49 @@
 """
 Simple graph implementation
 """
-from util import Stack, Queue  # These may come in handy
+from util import Stack, Queue, DisjointSet, iter_edges  # These may come in handy
+from instrumentation import instrumented
+from cache import QueryCache
+
+# Marks the starting vertex in a parent-pointer dictionary. A plain None
+# would clash with graphs that use None as a vertex label.
+_NO_PARENT = object()
 
 class Graph:
 
     """Represent a graph as a dictionary of vertices mapping labels to edges."""
-    def __init__(self):
+    def __init__(self, track_predecessors=False):
         self.vertices = {}
+        # Weakly connected components, kept up to date as edges are added.
+        # Set to None when they have to be rebuilt from scratch.
+        self._components = DisjointSet()
+        # Reverse index mapping each vertex to the vertices with an edge
+        # to it. None until it is turned on, then kept up to date.
+        self.predecessors = None
+        if track_predecessors:
+            self.enable_reverse_index()
+        # Bumped on every change made through the methods below, so cached
+        # query results can tell when they are out of date
+        self.version = 0
+        self.path_cache = None
 
     def add_vertex(self, vertex_id):
         """
         Add a vertex to the graph.
         """
+        self.version += 1
+        if vertex_id in self.vertices:
+            # Re-adding a vertex drops its edges, which can split a
+            # component; union-find can't undo merges, so start over later.
+            self._components = None
+            if self.predecessors is not None:
+                for neighbor in self.vertices[vertex_id]:
+                    self.predecessors[neighbor].discard(vertex_id)
+        else:
+            if self._components is not None:
+                self._components.add(vertex_id)
+            if self.predecessors is not None:
+                self.predecessors[vertex_id] = set()
         self.vertices[vertex_id] = set()
 
     def add_edge(self, v1, v2):
@@ -28,7 +59,12 @@ class Graph:
             v2_exists = True
         # Add the edge
         if v1_exists and v2_exists:
+            self.version += 1
             self.vertices[v1].add(v2)
+            if self._components is not None:
+                self._components.union(v1, v2)
+            if self.predecessors is not None:
+                self.predecessors[v2].add(v1)
         else:
             # Raise an error that states which vertex (or vertices) were not found
             if not v1_exists and not v2_exists:
@@ -38,6 +74,48 @@ class Graph:
             else:
                 raise KeyError(f'Vertex {v2} not found')
 
+    def add_edges_from(self, edges):
+        """
+        Add many directed edges at once, creating any vertices that don't
+        exist yet.
+
+        edges can be an iterable of (v1, v2) pairs, an N x 2 NumPy array,
+        or the path of an edge list file (see util.iter_edges).
+        Repeated edges are only stored once.
+        """
+        self.version += 1
+        vertices = self.vertices
+        components = self._components
+        predecessors = self.predecessors
+        for v1, v2 in iter_edges(edges):
+            neighbors = vertices.get(v1)
+            if neighbors is None:
+                neighbors = vertices[v1] = set()
+                if components is not None:
+                    components.add(v1)
+                if predecessors is not None:
+                    predecessors[v1] = set()
+            if v2 not in vertices:
+                vertices[v2] = set()
+                if components is not None:
+                    components.add(v2)
+                if predecessors is not None:
+                    predecessors[v2] = set()
+            neighbors.add(v2)
+            if components is not None:
+                components.union(v1, v2)
+            if predecessors is not None:
+                predecessors[v2].add(v1)
+
+    @classmethod
+    def from_edge_list(cls, edges):
+        """
+        Make a new Graph from edges, in any form add_edges_from accepts.
+        """
+        graph = cls()
+        graph.add_edges_from(edges)
+        return graph
+
     def get_neighbors(self, vertex_id):
         """
         Get all neighbors (edges) of a vertex.
@@ -49,44 +127,148 @@ class Graph:
         else:
             raise KeyError(f'Vertex {vertex_id} not found')
 
-    def bft(self, starting_vertex):
+    def enable_path_cache(self, max_bytes=64 * 2 ** 20):
         """
-        Print each vertex in breadth-first order
+        Cache the results of bfs, using up to about max_bytes of memory.
+
+        Adding vertices or edges through this class invalidates the cache;
+        changing self.vertices directly does not.
+        """
+        self.path_cache = QueryCache(max_bytes)
+
+    def enable_reverse_index(self):
+        """
+        Start keeping track of each vertex's predecessors (the vertices
+        with an edge pointing at it). Does nothing if already on.
+        """
+        if self.predecessors is None:
+            predecessors = {vertex: set() for vertex in self.vertices}
+            for vertex, neighbors in self.vertices.items():
+                for neighbor in neighbors:
+                    predecessors[neighbor].add(vertex)
+            self.predecessors = predecessors
+
+    def get_predecessors(self, vertex_id):
+        """
+        Get all vertices with an edge to vertex_id.
+
+        Turns on the reverse index the first time it's called.
+        """
+        self.enable_reverse_index()
+        if vertex_id in self.predecessors:
+            return self.predecessors[vertex_id]
+        else:
+            raise KeyError(f'Vertex {vertex_id} not found')
+
+    def in_degree(self, vertex_id):
+        """
+        Return how many edges point at vertex_id.
+        """
+        return len(self.get_predecessors(vertex_id))
+
+    @instrumented('Graph.iter_bft')
+    def iter_bft(self, starting_vertex, max_depth=None, include_info=False, until=None,
+                 reverse=False, _stats=None):
+        """
+        Lazily yield each vertex in breadth-first order
         beginning from starting_vertex.
+
+        max_depth stops the traversal from going more than that many
+        edges away from the start. With include_info, (vertex, depth, parent)
+        tuples are yielded instead, where parent is None for the start.
+        until is an optional function; the traversal stops right after
+        yielding the first vertex it returns True for. With reverse, edges
+        are followed backwards (from a vertex to its predecessors).
         """
-        # Define set of vertices already traversed
+        get_neighbors = self.get_predecessors if reverse else self.get_neighbors
+        # Raise a KeyError up front if the start doesn't exist
+        get_neighbors(starting_vertex)
         traversed_vertices = {starting_vertex}
-        # Create a Queue since it's breadth-first
         queue = Queue()
-        current_node = starting_vertex
-        # While current_node isn't None
-        while current_node:
-            print(current_node)
-            for neighbor in self.get_neighbors(current_node):
+        queue.enqueue((starting_vertex, 0, None))
+        while queue.size() > 0:
+            current_node, depth, parent = queue.dequeue()
+            if include_info:
+                yield current_node, depth, parent
+            else:
+                yield current_node
+            if until is not None and until(current_node):
+                return
+            if max_depth is not None and depth >= max_depth:
+                continue
+            neighbors = get_neighbors(current_node)
+            for neighbor in neighbors:
                 if neighbor not in traversed_vertices:
                     traversed_vertices.add(neighbor)
-                    queue.enqueue(neighbor)
-            # Dequeue and set it as current_node.
-            # If the queue is empty, current_node will be None
-            # and the while-loop will end.
-            current_node = queue.dequeue()
+                    queue.enqueue((neighbor, depth + 1, current_node))
+            if _stats is not None:
+                _stats.expand(len(neighbors), queue.size())
 
-    def dft(self, starting_vertex):
+    @instrumented('Graph.iter_dft')
+    def iter_dft(self, starting_vertex, max_depth=None, include_info=False, until=None,
+                 reverse=False, _stats=None):
         """
-        Print each vertex in depth-first order
+        Lazily yield each vertex in depth-first order
         beginning from starting_vertex.
+
+        Visits vertices in the same order as a recursive traversal would,
+        but keeps its own stack so deep graphs can't hit Python's
+        recursion limit. Takes the same options as iter_bft.
         """
-        # Same as above, just using a Stack instead since it's depth-first.
+        get_neighbors = self.get_predecessors if reverse else self.get_neighbors
+        get_neighbors(starting_vertex)
         traversed_vertices = {starting_vertex}
+        if include_info:
+            yield starting_vertex, 0, None
+        else:
+            yield starting_vertex
+        if (until is not None and until(starting_vertex)) or max_depth == 0:
+            return
+        # Each stack entry is a vertex, an iterator over the neighbors we
+        # haven't looked at yet, and the vertex's depth. This is exactly
+        # what a recursive call would keep on the call stack.
         stack = Stack()
-        current_node = starting_vertex
-        while current_node:
-            print(current_node)
-            for neighbor in self.get_neighbors(current_node):
+        neighbors = get_neighbors(starting_vertex)
+        stack.push((starting_vertex, iter(neighbors), 0))
+        if _stats is not None:
+            _stats.expand(len(neighbors), stack.size())
+        while stack.size() > 0:
+            frame = stack.pop()
+            current_node, neighbors, depth = frame
+            for neighbor in neighbors:
                 if neighbor not in traversed_vertices:
                     traversed_vertices.add(neighbor)
-                    stack.push(neighbor)
-            current_node = stack.pop()
+                    if include_info:
+                        yield neighbor, depth + 1, current_node
+                    else:
+                        yield neighbor
+                    if until is not None and until(neighbor):
+                        return
+                    # Come back to the rest of current_node's neighbors
+                    # once we're done going deeper.
+                    stack.push(frame)
+                    if max_depth is None or depth + 1 < max_depth:
+                        next_neighbors = get_neighbors(neighbor)
+                        stack.push((neighbor, iter(next_neighbors), depth + 1))
+                        if _stats is not None:
+                            _stats.expand(len(next_neighbors), stack.size())
+                    break
+
+    def bft(self, starting_vertex):
+        """
+        Print each vertex in breadth-first order
+        beginning from starting_vertex.
+        """
+        for vertex in self.iter_bft(starting_vertex):
+            print(vertex)
+
+    def dft(self, starting_vertex):
+        """
+        Print each vertex in depth-first order
+        beginning from starting_vertex.
+        """
+        for vertex in self.iter_dft(starting_vertex):
+            print(vertex)
 
     # def dft_recursive(self, starting_vertex):
     #     """
@@ -108,83 +290,250 @@ class Graph:
     #                 recursion_function(neighbor, traversed_vertices)
     #     recursion_function(starting_vertex, traversed_vertices)
 
-    def dft_recursive(self, starting_vertex, visited=None):
+    def dft_recursive(self, starting_vertex):
         """
         Print each vertex in depth-first order
         beginning from starting_vertex.
 
-        This should be done using recursion.
+        This used to be done using recursion; it now uses iter_dft,
+        which visits vertices in the same order without recursing.
         """
-        # Initial case
-        if visited is None:
-            visited = set()
+        self.dft(starting_vertex)
+
+    def _get_components(self):
+        if self._components is None:
+            components = DisjointSet()
+            for vertex in self.vertices:
+                components.add(vertex)
+            for vertex, neighbors in self.vertices.items():
+                for neighbor in neighbors:
+                    components.union(vertex, neighbor)
+            self._components = components
+        return self._components
 
-        # Print
-        print(starting_vertex)
+    def is_connected(self, v1, v2):
+        """
+        Return True if there is a path between v1 and v2,
+        ignoring which way the edges point.
+        """
+        try:
+            return self._get_components().connected(v1, v2)
+        except KeyError:
+            missing = v1 if v1 not in self.vertices else v2
+            raise KeyError(f'Vertex {missing} not found') from None
 
-        # Track visited nodes
-        visited.add(starting_vertex)
+    def component_size(self, vertex_id):
+        """
+        Return how many vertices are in vertex_id's (weakly connected) component.
+        """
+        try:
+            return self._get_components().size_of(vertex_id)
+        except KeyError:
+            raise KeyError(f'Vertex {vertex_id} not found') from None
 
-        # Call the function recursively on neighbors not visited
-        for neighbor in self.get_neighbors(starting_vertex):
-            if neighbor not in visited:
-                self.dft_recursive(neighbor, visited)
+    def count_components(self):
+        """
+        Return the number of (weakly connected) components.
+        """
+        return self._get_components().count
 
-    def bfs(self, starting_vertex, destination_vertex):
+    def strongly_connected_components(self):
+        """
+        Return a list of the strongly connected components as sets.
+
+        Uses Tarjan's algorithm with an explicit stack instead of
+        recursion. Components come out in reverse topological order:
+        nothing in a component has an edge to a later component.
+        """
+        index = {}
+        low_link = {}
+        on_stack = set()
+        component_stack = []
+        components = []
+        for root in self.vertices:
+            if root in index:
+                continue
+            index[root] = low_link[root] = len(index)
+            component_stack.append(root)
+            on_stack.add(root)
+            # Each entry is a vertex and an iterator over its remaining
+            # neighbors, like the frames of a recursive version
+            stack = Stack()
+            stack.push((root, iter(self.vertices[root])))
+            while stack.size() > 0:
+                frame = stack.pop()
+                vertex, neighbors = frame
+                for neighbor in neighbors:
+                    if neighbor not in index:
+                        index[neighbor] = low_link[neighbor] = len(index)
+                        component_stack.append(neighbor)
+                        on_stack.add(neighbor)
+                        stack.push(frame)
+                        stack.push((neighbor, iter(self.vertices[neighbor])))
+                        break
+                    elif neighbor in on_stack:
+                        low_link[vertex] = min(low_link[vertex], index[neighbor])
+                else:
+                    # Done with vertex: pass its low link up to its parent
+                    if stack.size() > 0:
+                        parent = stack.stack[-1][0]
+                        low_link[parent] = min(low_link[parent], low_link[vertex])
+                    if low_link[vertex] == index[vertex]:
+                        component = set()
+                        while True:
+                            member = component_stack.pop()
+                            on_stack.discard(member)
+                            component.add(member)
+                            if member == vertex:
+                                break
+                        components.append(component)
+        return components
+
+    def _build_path(self, parents, vertex):
+        """
+        Rebuild a path by following parent pointers back from vertex.
+        """
+        path = []
+        while vertex is not _NO_PARENT:
+            path.append(vertex)
+            vertex = parents[vertex]
+        path.reverse()
+        return path
+
+    @instrumented('Graph.bfs')
+    def bfs(self, starting_vertex, destination_vertex, _stats=None):
         """
         Return a list containing the shortest path from
         starting_vertex to destination_vertex in
         breath-first order.
+
+        Returns an empty list if there is no path, which includes a path
+        from a vertex to itself. Raises a KeyError if starting_vertex
+        isn't in the graph.
         """
-        searched_vertices = {starting_vertex}
+        if self.path_cache is None:
+            return self._bfs(starting_vertex, destination_vertex, _stats)
+        key = ('bfs', starting_vertex, destination_vertex)
+        path = self.path_cache.get(key, self.version)
+        if path is None:
+            path = self._bfs(starting_vertex, destination_vertex, _stats)
+            self.path_cache.put(key, path, self.version)
+        # Hand out a copy so callers can't change the cached path
+        return list(path)
+
+    def _bfs(self, starting_vertex, destination_vertex, _stats=None):
+        # Instead of queueing a copy of the whole path for every vertex,
+        # remember which vertex each one was discovered from and
+        # rebuild the path once when the destination is found.
+        # The start counts as already found, so asking for a path from a
+        # vertex to itself gives [], as it always has.
+        parents = {starting_vertex: _NO_PARENT}
         queue = Queue()
-        # Similar to a traversal, but instead of
-        # queueing values, we're queueing paths.
-        # Start at the starting vertex.
-        current_path = [starting_vertex]
-        while current_path:
-            for neighbor in self.get_neighbors(current_path[-1]):
-                if neighbor not in searched_vertices:
-                    # Create a copy so that we don't interfere with
-                    # the original path.
-                    new_path = current_path.copy()
-                    new_path.append(neighbor)
+        queue.enqueue(starting_vertex)
+        while queue.size() > 0:
+            current_node = queue.dequeue()
+            neighbors = self.get_neighbors(current_node)
+            if _stats is not None:
+                _stats.expand(len(neighbors), queue.size())
+            for neighbor in neighbors:
+                if neighbor not in parents:
+                    parents[neighbor] = current_node
                     if neighbor == destination_vertex:
                         # If we've found the destination, we're done.
-                        # Return the path we just made.
-                        return new_path
-                    else:
-                        searched_vertices.add(neighbor)
-                        queue.enqueue(new_path)
-            current_path = queue.dequeue()
-        
+                        return self._build_path(parents, neighbor)
+                    queue.enqueue(neighbor)
+
         # If the while-loop ends without finding the destination_vertex,
         # that means there's no path from the start to the destination.
         # So return an empty list.
         return []
 
-    def dfs(self, starting_vertex, destination_vertex):
+    @instrumented('Graph.bidirectional_bfs')
+    def bidirectional_bfs(self, starting_vertex, destination_vertex, reverse_vertices=None,
+                          _stats=None):
+        """
+        Return a list containing the shortest path from
+        starting_vertex to destination_vertex, searching forward from
+        the start and backward from the destination at the same time.
+
+        reverse_vertices maps each vertex to the vertices with an edge
+        pointing at it. It defaults to the graph's own reverse index if
+        that is turned on; otherwise this falls back to a regular bfs.
+        """
+        if reverse_vertices is None:
+            reverse_vertices = self.predecessors
+        if reverse_vertices is None:
+            return self.bfs(starting_vertex, destination_vertex)
+        # Make sure both ends exist, just like get_neighbors would
+        self.get_neighbors(starting_vertex)
+        self.get_neighbors(destination_vertex)
+        if starting_vertex == destination_vertex:
+            # Same answer as bfs
+            return []
+
+        forward_parents = {starting_vertex: _NO_PARENT}
+        backward_parents = {destination_vertex: _NO_PARENT}
+        forward_frontier = [starting_vertex]
+        backward_frontier = [destination_vertex]
+        while forward_frontier and backward_frontier:
+            # Always grow the smaller frontier by one full level
+            if len(forward_frontier) <= len(backward_frontier):
+                frontier, parents, other_parents = forward_frontier, forward_parents, backward_parents
+                adjacency = self.vertices
+            else:
+                frontier, parents, other_parents = backward_frontier, backward_parents, forward_parents
+                adjacency = reverse_vertices
+            next_frontier = []
+            meeting_vertex = _NO_PARENT
+            for vertex in frontier:
+                neighbors = adjacency.get(vertex, ())
+                if _stats is not None:
+                    _stats.expand(len(neighbors), len(next_frontier))
+                for neighbor in neighbors:
+                    if neighbor not in parents:
+                        parents[neighbor] = vertex
+                        next_frontier.append(neighbor)
+                        if neighbor in other_parents and meeting_vertex is _NO_PARENT:
+                            meeting_vertex = neighbor
+            if meeting_vertex is not _NO_PARENT:
+                # Stitch the forward half to the reversed backward half
+                path = self._build_path(forward_parents, meeting_vertex)
+                path.extend(reversed(self._build_path(backward_parents, meeting_vertex)[:-1]))
+                return path
+            if frontier is forward_frontier:
+                forward_frontier = next_frontier
+            else:
+                backward_frontier = next_frontier
+
+        return []
+
+    @instrumented('Graph.dfs')
+    def dfs(self, starting_vertex, destination_vertex, _stats=None):
         """
         Return a list containing a path from
         starting_vertex to destination_vertex in
         depth-first order.
+
+        Returns None if there is no path, which includes a path from a
+        vertex to itself. Raises a KeyError if starting_vertex isn't in
+        the graph.
         """
         # Same as the above, just using a Stack.
-        searched_vertices = {starting_vertex}
+        parents = {starting_vertex: _NO_PARENT}
         stack = Stack()
-        current_path = [starting_vertex]
-        while current_path:
-            for neighbor in self.get_neighbors(current_path[-1]):
-                if neighbor not in searched_vertices:
-                    new_path = current_path.copy()
-                    new_path.append(neighbor)
+        stack.push(starting_vertex)
+        while stack.size() > 0:
+            current_node = stack.pop()
+            neighbors = self.get_neighbors(current_node)
+            if _stats is not None:
+                _stats.expand(len(neighbors), stack.size())
+            for neighbor in neighbors:
+                if neighbor not in parents:
+                    parents[neighbor] = current_node
                     if neighbor == destination_vertex:
-                        return new_path
-                    else:
-                        searched_vertices.add(neighbor)
-                        stack.push(new_path)
-            current_path = stack.pop()
-        
+                        return self._build_path(parents, neighbor)
+                    stack.push(neighbor)
+
         return None
 
     # def dfs_recursive(self, starting_vertex, destination_vertex):
@@ -226,32 +575,21 @@ class Graph:
     #     return recursion_function(starting_vertex, destination_vertex,
     #                               traversed_vertices, path)
 
-    def dfs_recursive(self, starting_vertex, destination_vertex, visited=None, path=None):
+    def dfs_recursive(self, starting_vertex, destination_vertex):
         """
         Return a list containing a path from
         starting_vertex to destination_vertex in
         depth-first order.
 
-        This should be done using recursion.
+        This used to be done using recursion; it now follows iter_dft,
+        which finds the same path without recursing.
         """
-        if visited is None:
-            visited = set()
-        if path is None:
-            new_path = list()
-        else:
-            new_path = path.copy()
-
-        visited.add(starting_vertex)
-        new_path.append(starting_vertex)
-
-        if starting_vertex == destination_vertex:
-            return new_path
-        
-        for neighbor in self.get_neighbors(starting_vertex):
-            if neighbor not in visited:
-                search_path = self.dfs_recursive(neighbor, destination_vertex, visited, new_path)
-                if search_path:
-                    return search_path
+        parents = {}
+        for vertex, depth, parent in self.iter_dft(starting_vertex, include_info=True,
+                                                   until=lambda vertex: vertex == destination_vertex):
+            parents[vertex] = parent if depth > 0 else _NO_PARENT
+            if vertex == destination_vertex:
+                return self._build_path(parents, vertex)
 
 if __name__ == '__main__':
     graph = Graph()  # Instantiate your graph
@@ -0,0 +1,152 @@
+"""
+Opt-in counters for traversals.
+
+Traversals decorated with @instrumented count their work into a
+TraversalStats while a recorder is enabled:
+
+    import instrumentation
+    with instrumentation.recording() as recorder:
+        graph.bfs(1, 6)
+    print(recorder.to_dicts())
+
+While nothing is enabled, a decorated traversal costs one extra function
+call and the counting code inside it is skipped.
+"""
+import functools
+import inspect
+import json
+import time
+from contextlib import contextmanager
+
+
+class TraversalStats:
+
+    """Work done by one traversal call."""
+    __slots__ = ('name', 'vertices_expanded', 'edges_scanned', 'max_frontier',
+                 'path_copies', 'seconds', '_start')
+    def __init__(self, name):
+        self.name = name
+        self.vertices_expanded = 0
+        self.edges_scanned = 0
+        self.max_frontier = 0
+        self.path_copies = 0
+        self.seconds = None
+        self._start = time.perf_counter()
+
+    def expand(self, num_edges, frontier_size):
+        """
+        Count one vertex whose num_edges edges were scanned, after which
+        frontier_size vertices (or paths) were waiting to be visited.
+        """
+        self.vertices_expanded += 1
+        self.edges_scanned += num_edges
+        if frontier_size > self.max_frontier:
+            self.max_frontier = frontier_size
+
+    def to_dict(self):
+        return {'name': self.name,
+                'vertices_expanded': self.vertices_expanded,
+                'edges_scanned': self.edges_scanned,
+                'max_frontier': self.max_frontier,
+                'path_copies': self.path_copies,
+                'seconds': self.seconds}
+
+
+class StatsRecorder:
+
+    """
+    Collect the stats of every instrumented call.
+
+    Stats are kept in memory, written to stream as line-delimited JSON as
+    they come in, or both.
+    """
+    def __init__(self, stream=None, keep=True):
+        self.stream = stream
+        self.keep = keep
+        self.records = []
+
+    def record(self, stats):
+        record = stats.to_dict()
+        if self.keep:
+            self.records.append(record)
+        if self.stream is not None:
+            self.stream.write(json.dumps(record) + '\n')
+
+    def to_dicts(self):
+        return list(self.records)
+
+    def write_jsonl(self, stream):
+        for record in self.records:
+            stream.write(json.dumps(record) + '\n')
+
+
+# The enabled recorder, or None
+_recorder = None
+
+
+def enable(recorder=None):
+    """
+    Start recording instrumented calls. Returns the recorder in use.
+    """
+    global _recorder
+    _recorder = recorder if recorder is not None else StatsRecorder()
+    return _recorder
+
+
+def disable():
+    global _recorder
+    _recorder = None
+
+
+@contextmanager
+def recording(recorder=None):
+    """
+    Record instrumented calls inside a with block.
+    """
+    previous = _recorder
+    try:
+        yield enable(recorder)
+    finally:
+        if previous is None:
+            disable()
+        else:
+            enable(previous)
+
+
+def _finish(stats, recorder):
+    stats.seconds = time.perf_counter() - stats._start
+    recorder.record(stats)
+
+
+def _finish_after(generator, stats, recorder):
+    # Generators are only done once they are exhausted or closed
+    try:
+        yield from generator
+    finally:
+        _finish(stats, recorder)
+
+
+def instrumented(name):
+    """
+    Decorate a traversal that takes a _stats=None keyword argument.
+
+    When a recorder is enabled, the traversal is given a TraversalStats to
+    count into, which is recorded when the call (or for a generator, the
+    iteration) finishes. Otherwise it is called with _stats=None.
+    """
+    def decorator(function):
+        is_generator = inspect.isgeneratorfunction(function)
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            recorder = _recorder
+            if recorder is None:
+                return function(*args, **kwargs)
+            stats = TraversalStats(name)
+            if is_generator:
+                return _finish_after(function(*args, _stats=stats, **kwargs), stats, recorder)
+            try:
+                return function(*args, _stats=stats, **kwargs)
+            finally:
+                _finish(stats, recorder)
+        return wrapper
+    return decorator
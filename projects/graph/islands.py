@@ -8,53 +8,117 @@ islands = [[0, 1, 0, 1, 0],
            [1, 1, 0, 0, 0]]
 island_counter(islands) # returns 4
 """
-def get_neighbors(matrix, node_x, node_y, size):
-    neighbors = []
-    if node_y > 0:
-        n_neighbor = (node_y-1, node_x)
-        neighbors.append(n_neighbor)
-    if node_x > 0:
-        w_neighbor = (node_y, node_x-1)
-        neighbors.append(w_neighbor)
-    if node_y < size-1:
-        s_neighbor = (node_y+1, node_x)
-        neighbors.append(s_neighbor)
-    if node_x < size-1:
-        e_neighbor = (node_y, node_x+1)
-        neighbors.append(e_neighbor)
-    return neighbors
-    
-
-def dft_traversal_recursive(matrix, node_x, node_y, size, visited):
-    neighbors = get_neighbors(matrix, node_x, node_y, size)
-    for neighbor in neighbors:
-        if neighbor not in visited:
-            visited.add(neighbor)
-            neighbor_x = neighbor[0]
-            neighbor_y = neighbor[1]
-            if matrix[neighbor_x][neighbor_y] == 1:
-                dft_traversal_recursive(matrix, neighbor_x, neighbor_y,
-                                        size, visited)
-
-
-def find_islands(matrix):
-    size = len(matrix)
-    visited = set()
-    islands = 0
-    for i in range(size):
-        for j in range(size):
-            if (i, j) not in visited:
-                visited.add((i, j))
-                if matrix[i][j] == 1:
-                    dft_traversal_recursive(matrix, j, i, size, visited)
-                    islands += 1
-
-    return islands
+import re
+from array import array
 
-islands = [[0, 1, 0, 1, 0],
-           [1, 1, 0, 1, 1],
-           [0, 0, 1, 0, 0],
-           [1, 0, 1, 0, 0],
-           [1, 1, 0, 0, 0]]
 
-print(find_islands(islands))
\ No newline at end of file
+def _find_root(parents, run):
+    # Union-find lookup with path halving
+    while parents[run] != run:
+        parents[run] = parents[parents[run]]
+        run = parents[run]
+    return run
+
+
+def label_islands(matrix, connectivity=4, return_labels=True):
+    """
+    Find the islands of 1s in a rectangular 2D binary array.
+
+    matrix can be a list of lists, or anything whose rows can be iterated
+    over, such as a 2D NumPy array. Anything truthy counts as land.
+    connectivity is 4 (north, south, east, west) or 8 (diagonals too).
+
+    Returns (count, labels, sizes). labels is a list of rows (array('l'))
+    where each cell holds its island number from 1 to count, or 0 for
+    water; it is None if return_labels is False. sizes[k] is the number of
+    cells in island k + 1.
+
+    Rather than visiting cells one at a time, each row is split into runs
+    of consecutive 1s, and runs that touch a run in the row above are
+    merged with union-find. Nothing recurses, so huge islands can't
+    overflow the stack.
+    """
+    if connectivity not in (4, 8):
+        raise ValueError('connectivity must be 4 or 8')
+    # With 8-connectivity, runs that only touch at a corner also count
+    reach = 1 if connectivity == 8 else 0
+    land = re.compile(b'\x01+')
+
+    # Runs are numbered in the order they are found. For run k,
+    # run_rows/run_starts/run_ends give its position (end is exclusive).
+    run_rows = array('l')
+    run_starts = array('l')
+    run_ends = array('l')
+    parents = array('l')
+    width = None
+    num_rows = 0
+    previous_first = previous_last = 0
+    for row_index, row in enumerate(matrix):
+        if width is None:
+            width = len(row)
+        elif len(row) != width:
+            raise ValueError('All rows must have the same length')
+        num_rows += 1
+        first = len(run_starts)
+        # map(bool, ...) turns the row into 0/1 bytes without a Python
+        # loop, so a regex can find the runs of land
+        for match in land.finditer(bytes(map(bool, row))):
+            start, end = match.span()
+            run = len(run_starts)
+            run_rows.append(row_index)
+            run_starts.append(start)
+            run_ends.append(end)
+            parents.append(run)
+            # Both rows' runs are sorted, so skip the ones in the row above
+            # that end before this run can touch them.
+            while previous_first < previous_last and run_ends[previous_first] + reach <= start:
+                previous_first += 1
+            above = previous_first
+            while above < previous_last and run_starts[above] < end + reach:
+                root_above = _find_root(parents, above)
+                root = _find_root(parents, run)
+                if root != root_above:
+                    # Point the newer root at the older one
+                    if root < root_above:
+                        parents[root_above] = root
+                    else:
+                        parents[root] = root_above
+                above += 1
+        previous_first, previous_last = first, len(run_starts)
+
+    # Give each island a number from 1 in the order its first run appears
+    island_of_root = {}
+    run_islands = array('l', [0]) * len(run_starts)
+    sizes = []
+    for run in range(len(run_starts)):
+        root = _find_root(parents, run)
+        if root not in island_of_root:
+            island_of_root[root] = len(sizes) + 1
+            sizes.append(0)
+        island = island_of_root[root]
+        run_islands[run] = island
+        sizes[island - 1] += run_ends[run] - run_starts[run]
+
+    labels = None
+    if return_labels:
+        labels = [array('l', [0]) * (width or 0) for _ in range(num_rows)]
+        for run in range(len(run_starts)):
+            row = labels[run_rows[run]]
+            start = run_starts[run]
+            row[start:run_ends[run]] = array('l', [run_islands[run]]) * (run_ends[run] - start)
+    return len(sizes), labels, sizes
+
+
+def find_islands(matrix, connectivity=4):
+    count, _, _ = label_islands(matrix, connectivity, return_labels=False)
+    return count
+
+
+if __name__ == '__main__':
+    islands = [[0, 1, 0, 1, 0],
+               [1, 1, 0, 1, 1],
+               [0, 0, 1, 0, 0],
+               [1, 0, 1, 0, 0],
+               [1, 1, 0, 0, 0]]
+
+    print(find_islands(islands))
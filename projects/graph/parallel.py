@@ -0,0 +1,151 @@
+"""
+Breadth-first searches from many sources at once, spread over processes
+"""
+from array import array
+from multiprocessing import Pool, shared_memory
+from csr import CSRGraph
+from util import RingQueue
+
+
+def _as_csr(graph):
+    """
+    Accept a CSRGraph, a Graph, a SocialGraph or an adjacency dictionary.
+    """
+    if isinstance(graph, CSRGraph):
+        return graph
+    if hasattr(graph, 'vertices'):
+        return CSRGraph.from_graph(graph)
+    if hasattr(graph, 'friendships'):
+        return CSRGraph.from_adjacency(graph.friendships)
+    return CSRGraph.from_adjacency(graph)
+
+
+class SharedCSR:
+
+    """
+    Copy a CSRGraph's offset and neighbor arrays into shared memory once,
+    so worker processes can read them without each getting a pickled copy.
+
+    Use as a context manager; the shared memory is freed on exit.
+    """
+    def __init__(self, csr):
+        self.offsets = self._share(csr.offsets)
+        self.neighbors = self._share(csr.neighbors)
+        self.offsets_length = len(csr.offsets)
+        self.neighbors_length = len(csr.neighbors)
+
+    @staticmethod
+    def _share(values):
+        # Shared memory blocks can't be empty
+        block = shared_memory.SharedMemory(create=True, size=max(values.itemsize * len(values), 1))
+        view = block.buf.cast('q')
+        view[:len(values)] = values
+        view.release()
+        return block
+
+    def names(self):
+        """
+        Everything a worker needs to attach to the arrays.
+        """
+        return (self.offsets.name, self.offsets_length,
+                self.neighbors.name, self.neighbors_length)
+
+    def close(self):
+        for block in (self.offsets, self.neighbors):
+            block.close()
+            block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Set in each worker process by _init_worker
+_blocks = None
+_offsets = None
+_neighbors = None
+
+
+def _attach(name, length):
+    # Workers share their parent's resource tracker, so the block is still
+    # freed exactly once, by the parent's SharedCSR.close
+    block = shared_memory.SharedMemory(name=name)
+    return block, block.buf.cast('q')[:length]
+
+
+def _init_worker(offsets_name, offsets_length, neighbors_name, neighbors_length):
+    global _blocks, _offsets, _neighbors
+    offsets_block, _offsets = _attach(offsets_name, offsets_length)
+    neighbors_block, _neighbors = _attach(neighbors_name, neighbors_length)
+    # Keep the blocks alive as long as the views are in use
+    _blocks = (offsets_block, neighbors_block)
+
+
+def bfs_distances(offsets, neighbors, source):
+    """
+    Return an array of the number of edges from source to every vertex
+    index, with -1 for vertices that can't be reached.
+    """
+    num_vertices = len(offsets) - 1
+    distances = array('i', [-1]) * num_vertices
+    distances[source] = 0
+    queue = RingQueue(num_vertices)
+    queue.enqueue(source)
+    while queue.size() > 0:
+        vertex = queue.dequeue()
+        distance = distances[vertex] + 1
+        for neighbor in neighbors[offsets[vertex]:offsets[vertex + 1]]:
+            if distances[neighbor] < 0:
+                distances[neighbor] = distance
+                queue.enqueue(neighbor)
+    return distances
+
+
+def summarize_distances(distances):
+    """
+    Return (vertices reached, mean distance, furthest distance) for an
+    iterable of distances from one source, not counting the source itself
+    (distance 0) or unreachable vertices (-1).
+    """
+    reached = [distance for distance in distances if distance > 0]
+    if not reached:
+        return (0, 0.0, 0)
+    return (len(reached), sum(reached) / len(reached), max(reached))
+
+
+def _worker_bfs(task):
+    source, summary = task
+    distances = bfs_distances(_offsets, _neighbors, source)
+    return source, summarize_distances(distances) if summary else distances
+
+
+def multi_source_bfs(graph, sources=None, processes=None, summary=False, chunksize=16):
+    """
+    Run a breadth-first search from each of sources (every vertex by
+    default) using a pool of processes worker processes.
+
+    graph can be a Graph, a SocialGraph, a CSRGraph or an adjacency
+    dictionary. It is converted to flat arrays and put in shared memory
+    once, rather than being pickled for every worker.
+
+    Returns a dictionary mapping each source to either a dictionary of
+    {vertex: distance} for every vertex it reaches, or with summary, a
+    (vertices reached, mean distance, furthest distance) tuple that
+    doesn't count the source itself.
+    """
+    csr = _as_csr(graph)
+    if sources is None:
+        sources = csr.labels
+    tasks = [(csr._get_index(source), summary) for source in sources]
+    labels = csr.labels
+    results = {}
+    with SharedCSR(csr) as shared:
+        with Pool(processes, initializer=_init_worker, initargs=shared.names()) as pool:
+            for source, result in pool.imap_unordered(_worker_bfs, tasks, chunksize):
+                if not summary:
+                    result = {labels[vertex]: distance
+                              for vertex, distance in enumerate(result) if distance >= 0}
+                results[labels[source]] = result
+    return results
@@ -1,7 +1,13 @@
 import unittest
 import sys
 import io
+import os
+import tempfile
 from graph import Graph
+from csr import CSRGraph
+from util import Queue, RingQueue
+from parallel import multi_source_bfs
+import instrumentation
 
 class Test(unittest.TestCase):
     def setUp(self):
@@ -97,10 +103,157 @@ class Test(unittest.TestCase):
 
         sys.stdout = stdout_  # Restore stdout
 
+    def test_from_edge_list(self):
+        edges = [(1, 2), (2, 3), (2, 4), (3, 5), (4, 6), (4, 7), (5, 3), (6, 3), (7, 1), (7, 6), (1, 2)]
+        graph = Graph.from_edge_list(edges)
+        self.assertDictEqual(graph.vertices, self.graph.vertices)
+        self.assertEqual(graph.component_size(1), 7)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('# parent,child\n1,2\n\n2 3\n3, a\n')
+        try:
+            graph = Graph.from_edge_list(f.name)
+        finally:
+            os.remove(f.name)
+        self.assertDictEqual(graph.vertices, {1: {2}, 2: {3}, 3: {'a'}, 'a': set()})
+
+    def test_predecessors(self):
+        self.assertSetEqual(self.graph.get_predecessors(3), {2, 5, 6})
+        self.assertEqual(self.graph.in_degree(1), 1)
+        self.graph.add_vertex(8)
+        self.graph.add_edge(8, 1)
+        self.graph.add_edges_from([(9, 1)])
+        self.assertSetEqual(self.graph.get_predecessors(1), {7, 8, 9})
+        self.graph.add_vertex(7)
+        self.assertSetEqual(self.graph.get_predecessors(1), {8, 9})
+        self.assertSetEqual(self.graph.get_predecessors(9), set())
+        self.assertRaises(KeyError, self.graph.get_predecessors, 10)
+
+    def test_reverse_traversal(self):
+        self.assertCountEqual(list(self.graph.iter_bft(6, reverse=True)), [6, 4, 7, 2, 1])
+        self.assertListEqual(list(self.graph.iter_dft(1, max_depth=1, reverse=True)), [1, 7])
+        self.graph.enable_reverse_index()
+        self.assertListEqual(self.graph.bidirectional_bfs(4, 5), [4, 6, 3, 5])
+
+    def test_instrumentation(self):
+        with instrumentation.recording() as recorder:
+            self.graph.bfs(1, 6)
+            list(self.graph.iter_bft(1))
+        self.graph.bfs(1, 6)
+        records = recorder.to_dicts()
+        self.assertListEqual([record['name'] for record in records], ['Graph.bfs', 'Graph.iter_bft'])
+        self.assertEqual(records[0]['vertices_expanded'], 4)
+        self.assertEqual(records[1]['vertices_expanded'], 7)
+        self.assertEqual(records[1]['edges_scanned'], 10)
+        output = io.StringIO()
+        recorder.write_jsonl(output)
+        self.assertEqual(len(output.getvalue().splitlines()), 2)
+
+    def test_path_cache(self):
+        self.graph.enable_path_cache()
+        self.assertListEqual(self.graph.bfs(1, 6), [1, 2, 4, 6])
+        self.graph.bfs(1, 6).append(8)
+        self.assertListEqual(self.graph.bfs(1, 6), [1, 2, 4, 6])
+        self.assertEqual(self.graph.path_cache.hits, 2)
+        # A new edge makes a shorter path
+        self.graph.add_edge(1, 6)
+        self.assertListEqual(self.graph.bfs(1, 6), [1, 6])
+        self.assertEqual(len(self.graph.path_cache), 1)
+
+    def test_path_cache_eviction(self):
+        self.graph.enable_path_cache(max_bytes=400)
+        for vertex in range(1, 8):
+            self.graph.bfs(1, vertex)
+        self.assertLessEqual(self.graph.path_cache.current_bytes, 400)
+        self.assertLess(len(self.graph.path_cache), 7)
+
+    def test_components(self):
+        self.assertTrue(self.graph.is_connected(1, 6))
+        self.assertTrue(self.graph.is_connected(6, 1))
+        self.assertEqual(self.graph.component_size(3), 7)
+        self.graph.add_vertex(8)
+        self.graph.add_vertex(9)
+        self.assertFalse(self.graph.is_connected(1, 8))
+        self.assertEqual(self.graph.count_components(), 3)
+        self.graph.add_edge(9, 8)
+        self.assertTrue(self.graph.is_connected(8, 9))
+        self.assertEqual(self.graph.component_size(8), 2)
+        self.assertRaises(KeyError, self.graph.is_connected, 1, 10)
+        # Re-adding a vertex drops its edges
+        self.graph.add_vertex(9)
+        self.assertFalse(self.graph.is_connected(8, 9))
+        self.assertEqual(self.graph.count_components(), 3)
+
+    def test_strongly_connected_components(self):
+        components = self.graph.strongly_connected_components()
+        self.assertCountEqual(components, [{1, 2, 4, 7}, {3, 5}, {6}])
+        # Every edge goes to the same or an earlier component
+        position = {vertex: i for i, component in enumerate(components) for vertex in component}
+        for vertex, neighbors in self.graph.vertices.items():
+            for neighbor in neighbors:
+                self.assertLessEqual(position[neighbor], position[vertex])
+
+    def test_iter_bft(self):
+        self.assertListEqual(list(self.graph.iter_bft(1, max_depth=1)), [1, 2])
+        self.assertCountEqual(list(self.graph.iter_bft(1, max_depth=2)), [1, 2, 3, 4])
+        self.assertListEqual(list(self.graph.iter_bft(1, until=lambda vertex: vertex == 2)), [1, 2])
+        info = {vertex: (depth, parent) for vertex, depth, parent in
+                self.graph.iter_bft(1, include_info=True)}
+        self.assertEqual(info[1], (0, None))
+        self.assertEqual(info[6], (3, 4))
+
+    def test_iter_dft(self):
+        dft = [
+            [1, 2, 3, 5, 4, 6, 7],
+            [1, 2, 3, 5, 4, 7, 6],
+            [1, 2, 4, 7, 6, 3, 5],
+            [1, 2, 4, 6, 3, 5, 7]
+        ]
+        self.assertIn(list(self.graph.iter_dft(1)), dft)
+        self.assertListEqual(list(self.graph.iter_dft(1, max_depth=1)), [1, 2])
+        self.assertListEqual(list(self.graph.iter_dft(5, until=lambda vertex: vertex == 3)), [5, 3])
+
+    def test_deep_graph(self):
+        graph = Graph()
+        depth = sys.getrecursionlimit() * 2
+        graph.add_vertex(0)
+        for vertex in range(1, depth):
+            graph.add_vertex(vertex)
+            graph.add_edge(vertex - 1, vertex)
+        self.assertEqual(len(list(graph.iter_dft(0))), depth)
+        self.assertEqual(len(graph.dfs_recursive(0, depth - 1)), depth)
+
     def test_bfs(self):
         bfs = [1, 2, 4, 6]
         self.assertListEqual(self.graph.bfs(1, 6), bfs)
 
+    def test_bfs_no_path(self):
+        self.graph.add_vertex(8)
+        self.assertListEqual(self.graph.bfs(1, 8), [])
+        self.assertIsNone(self.graph.dfs(1, 8))
+
+    def test_search_to_self(self):
+        self.assertListEqual(self.graph.bfs(1, 1), [])
+        self.assertIsNone(self.graph.dfs(1, 1))
+        self.graph.enable_reverse_index()
+        self.assertListEqual(self.graph.bidirectional_bfs(1, 1), [])
+
+    def test_search_missing_vertex(self):
+        self.assertRaises(KeyError, self.graph.bfs, 8, 8)
+        self.assertRaises(KeyError, self.graph.dfs, 8, 1)
+        self.assertListEqual(self.graph.bfs(1, 8), [])
+        self.assertIsNone(self.graph.dfs(1, 8))
+
+    def test_bidirectional_bfs(self):
+        reverse_vertices = {vertex: set() for vertex in self.graph.vertices}
+        for vertex, neighbors in self.graph.vertices.items():
+            for neighbor in neighbors:
+                reverse_vertices[neighbor].add(vertex)
+        self.assertListEqual(self.graph.bidirectional_bfs(1, 6, reverse_vertices), [1, 2, 4, 6])
+        self.assertListEqual(self.graph.bidirectional_bfs(4, 5, reverse_vertices), [4, 6, 3, 5])
+        self.assertListEqual(self.graph.bidirectional_bfs(3, 1, reverse_vertices), [])
+        self.assertListEqual(self.graph.bidirectional_bfs(1, 6), [1, 2, 4, 6])
+
     def test_dfs(self):
         dfs = [
             [1, 2, 4, 6],
@@ -115,5 +268,93 @@ class Test(unittest.TestCase):
         ]
         self.assertIn(self.graph.dfs_recursive(1,6), dfs)
 
+class CSRTest(unittest.TestCase):
+    def setUp(self):
+        sources = [5, 6, 7, 4, 1, 7, 2, 3, 2, 4]
+        targets = [3, 3, 1, 7, 2, 6, 4, 5, 3, 6]
+        self.graph = CSRGraph.from_edges(sources, targets)
+
+    def test_from_graph(self):
+        graph = Graph()
+        for vertex in self.graph.labels:
+            graph.add_vertex(vertex)
+        for vertex in self.graph.labels:
+            for neighbor in self.graph.get_neighbors(vertex):
+                graph.add_edge(vertex, neighbor)
+        csr = CSRGraph.from_graph(graph)
+        self.assertDictEqual(csr.to_graph().vertices, graph.vertices)
+
+    def test_to_graph_components(self):
+        csr = CSRGraph.from_graph(Graph.from_edge_list([(1, 2), (2, 3), (4, 4)]))
+        graph = csr.to_graph()
+        self.assertTrue(graph.is_connected(1, 3))
+        self.assertFalse(graph.is_connected(1, 4))
+        self.assertEqual(graph.count_components(), 2)
+
+    def test_get_neighbors(self):
+        self.assertCountEqual(self.graph.get_neighbors(2), [3, 4])
+        self.assertCountEqual(self.graph.get_neighbors(7), [1, 6])
+        self.assertRaises(KeyError, self.graph.get_neighbors, 8)
+
+    def test_duplicate_edges(self):
+        graph = CSRGraph.from_edges([1, 1, 2], [2, 2, 1])
+        self.assertListEqual(graph.get_neighbors(1), [2])
+
+    def test_bfs(self):
+        self.assertListEqual(self.graph.bfs(1, 6), [1, 2, 4, 6])
+        self.assertListEqual(self.graph.bfs(3, 1), [])
+
+    def test_dfs(self):
+        self.assertIn(self.graph.dfs(1, 6), [[1, 2, 4, 6], [1, 2, 4, 7, 6]])
+        self.assertIsNone(self.graph.dfs(3, 1))
+        # Same answers as Graph for a vertex to itself
+        self.assertListEqual(self.graph.bfs(1, 1), [])
+        self.assertIsNone(self.graph.dfs(1, 1))
+
+    def test_bft(self):
+        stdout_ = sys.stdout
+        sys.stdout = io.StringIO()
+        self.graph.bft(1)
+        output = sys.stdout.getvalue()
+        sys.stdout = stdout_  # Restore stdout
+
+        self.assertListEqual(output.split()[:2], ['1', '2'])
+        self.assertCountEqual(output.split(), [str(i) for i in range(1, 8)])
+
+class ParallelTest(unittest.TestCase):
+    def setUp(self):
+        sources = [5, 6, 7, 4, 1, 7, 2, 3, 2, 4]
+        targets = [3, 3, 1, 7, 2, 6, 4, 5, 3, 6]
+        self.graph = CSRGraph.from_edges(sources, targets)
+
+    def test_multi_source_bfs(self):
+        distances = multi_source_bfs(self.graph, processes=2)
+        self.assertDictEqual(distances[1], {1: 0, 2: 1, 3: 2, 4: 2, 5: 3, 6: 3, 7: 3})
+        self.assertDictEqual(distances[3], {3: 0, 5: 1})
+        summary = multi_source_bfs(self.graph, [1, 6], processes=2, summary=True)
+        self.assertDictEqual(summary, {1: (6, 14 / 6, 3), 6: (2, 1.5, 2)})
+
+    def test_multi_source_bfs_graph(self):
+        # A regular Graph gives the same answers as its CSRGraph
+        graph = self.graph.to_graph()
+        self.assertDictEqual(multi_source_bfs(graph, [1, 4], processes=1),
+                             multi_source_bfs(self.graph, [1, 4], processes=1))
+        self.assertRaises(KeyError, multi_source_bfs, graph, [8], 1)
+
+class QueueTest(unittest.TestCase):
+    def test_queue_order(self):
+        for queue in (Queue(), RingQueue(3)):
+            for value in (1, 2, 3):
+                queue.enqueue(value)
+            self.assertEqual(queue.dequeue(), 1)
+            queue.enqueue(4)
+            self.assertEqual(queue.size(), 3)
+            self.assertListEqual([queue.dequeue() for _ in range(4)], [2, 3, 4, None])
+
+    def test_ring_queue_full(self):
+        queue = RingQueue(1)
+        queue.enqueue(1)
+        self.assertRaises(IndexError, queue.enqueue, 2)
+
 if __name__ == '__main__':
     unittest.main()
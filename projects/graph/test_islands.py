@@ -0,0 +1,78 @@
+import random
+import unittest
+from islands import find_islands, label_islands
+
+
+def count_islands_slowly(matrix, connectivity):
+    """Flood fill every island one cell at a time, for comparison."""
+    height, width = len(matrix), len(matrix[0])
+    steps = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    if connectivity == 8:
+        steps += [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+    visited = set()
+    sizes = []
+    for i in range(height):
+        for j in range(width):
+            if matrix[i][j] and (i, j) not in visited:
+                visited.add((i, j))
+                stack = [(i, j)]
+                size = 0
+                while stack:
+                    y, x = stack.pop()
+                    size += 1
+                    for dy, dx in steps:
+                        ny, nx = y + dy, x + dx
+                        if (0 <= ny < height and 0 <= nx < width and
+                                matrix[ny][nx] and (ny, nx) not in visited):
+                            visited.add((ny, nx))
+                            stack.append((ny, nx))
+                sizes.append(size)
+    return sizes
+
+
+class Test(unittest.TestCase):
+    def test_find_islands(self):
+        islands = [[0, 1, 0, 1, 0],
+                   [1, 1, 0, 1, 1],
+                   [0, 0, 1, 0, 0],
+                   [1, 0, 1, 0, 0],
+                   [1, 1, 0, 0, 0]]
+        self.assertEqual(find_islands(islands), 4)
+        self.assertEqual(find_islands(islands, connectivity=8), 1)
+
+    def test_labels(self):
+        islands = [[1, 1, 0, 1],
+                   [0, 1, 0, 1],
+                   [1, 0, 0, 0]]
+        count, labels, sizes = label_islands(islands)
+        self.assertEqual(count, 3)
+        self.assertListEqual([list(row) for row in labels],
+                             [[1, 1, 0, 2],
+                              [0, 1, 0, 2],
+                              [3, 0, 0, 0]])
+        self.assertListEqual(sizes, [3, 2, 1])
+
+    def test_random_grids(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            height, width = rng.randint(1, 12), rng.randint(1, 12)
+            matrix = [[int(rng.random() < 0.5) for _ in range(width)] for _ in range(height)]
+            for connectivity in (4, 8):
+                count, _, sizes = label_islands(matrix, connectivity)
+                expected = count_islands_slowly(matrix, connectivity)
+                self.assertEqual(count, len(expected))
+                self.assertCountEqual(sizes, expected)
+
+    def test_bad_input(self):
+        self.assertRaises(ValueError, label_islands, [[1, 0], [1]])
+
+    def test_iterable_rows(self):
+        rows = [[1, 1, 0, 1], [0, 1, 0, 1], [1, 0, 0, 0]]
+        count, labels, sizes = label_islands(iter(rows))
+        self.assertEqual((count, sizes), label_islands(rows)[::2])
+        self.assertEqual(labels, label_islands(rows)[1])
+        self.assertEqual(label_islands(row for row in []), (0, [], []))
+        self.assertRaises(ValueError, label_islands, [[1]], connectivity=6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,19 +1,88 @@
+import os
+import re
+from array import array
+from collections import deque
 
-# Note: This Queue class is sub-optimal. Why?
+
+def _parse_label(text):
+    # Vertex labels in files are ints when they look like ints
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+def iter_edges(source):
+    """
+    Yield (v1, v2) pairs from an edge list.
+
+    source can be any iterable of pairs, an N x 2 NumPy array, or the path
+    of a text file with one edge per line, the two labels separated by a
+    comma and/or whitespace. Blank lines and lines starting with # are
+    skipped, as is anything after the second label.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        separator = re.compile(r'[,\s]+')
+        with open(source, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                fields = separator.split(line)
+                if len(fields) < 2:
+                    raise ValueError(f'Expected two vertices per line, got {line!r}')
+                yield _parse_label(fields[0]), _parse_label(fields[1])
+        return
+    if hasattr(source, 'tolist'):
+        # Converting a NumPy array in one go is much faster than row by row
+        source = source.tolist()
+    for v1, v2 in source:
+        yield v1, v2
+
+
+# Backed by a deque, so enqueue and dequeue are both O(1).
+# (A plain list would need pop(0), which shifts every remaining item.)
 class Queue():
+    __slots__ = ('queue',)
     def __init__(self):
-        self.queue = []
+        self.queue = deque()
     def enqueue(self, value):
         self.queue.append(value)
     def dequeue(self):
         if self.size() > 0:
-            return self.queue.pop(0)
+            return self.queue.popleft()
         else:
             return None
     def size(self):
         return len(self.queue)
 
+# Fixed-capacity queue of integers (e.g. vertex indexes) stored in one
+# preallocated array, so it never allocates while it is being used.
+class RingQueue():
+    __slots__ = ('queue', 'head', 'count')
+    def __init__(self, capacity):
+        self.queue = array('q', [0]) * capacity
+        self.head = 0
+        self.count = 0
+    def enqueue(self, value):
+        capacity = len(self.queue)
+        if self.count == capacity:
+            raise IndexError(f'RingQueue is full (capacity {capacity})')
+        self.queue[(self.head + self.count) % capacity] = value
+        self.count += 1
+    def dequeue(self):
+        if self.count > 0:
+            value = self.queue[self.head]
+            self.head = (self.head + 1) % len(self.queue)
+            self.count -= 1
+            return value
+        else:
+            return None
+    def size(self):
+        return self.count
+
 class Stack():
+    __slots__ = ('stack',)
     def __init__(self):
         self.stack = []
     def push(self, value):
@@ -26,3 +95,41 @@ class Stack():
     def size(self):
         return len(self.stack)
 
+# Union-find over arbitrary hashable items. Finding an item's set and
+# merging two sets both take close to constant time.
+class DisjointSet():
+    __slots__ = ('parents', 'sizes', 'count')
+    def __init__(self):
+        self.parents = {}
+        # Only kept up to date for each set's root
+        self.sizes = {}
+        self.count = 0
+    def add(self, item):
+        if item not in self.parents:
+            self.parents[item] = item
+            self.sizes[item] = 1
+            self.count += 1
+    def find(self, item):
+        parents = self.parents
+        if item not in parents:
+            raise KeyError(f'{item} not found')
+        # Path halving: point every other item on the way at its grandparent
+        while parents[item] != item:
+            parents[item] = parents[parents[item]]
+            item = parents[item]
+        return item
+    def union(self, item1, item2):
+        root1 = self.find(item1)
+        root2 = self.find(item2)
+        if root1 == root2:
+            return
+        # Hang the smaller set under the bigger one
+        if self.sizes[root1] < self.sizes[root2]:
+            root1, root2 = root2, root1
+        self.parents[root2] = root1
+        self.sizes[root1] += self.sizes.pop(root2)
+        self.count -= 1
+    def connected(self, item1, item2):
+        return self.find(item1) == self.find(item2)
+    def size_of(self, item):
+        return self.sizes[self.find(item)]
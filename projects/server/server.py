@@ -0,0 +1,255 @@
+"""
+Serve path, reach and ancestor queries from graphs loaded once in memory.
+
+Usage:
+    python server.py [--host HOST] [--port PORT | --unix PATH]
+                     [--edges FILE | --social-edges FILE | --users N]
+                     [--avg-friendships K] [--seed SEED]
+                     [--ancestors FILE] [--processes N]
+
+Clients send one JSON object per line and get one JSON object per line
+back. Replies can come back in a different order from the requests, so
+each reply repeats the request's "id":
+
+    {"id": 1, "op": "path", "source": 1, "dest": 6}
+    {"id": 1, "result": [1, 2, 4, 6]}
+
+Operations:
+    path      {"source", "dest"}   shortest path as a list, [] if none
+    reach     {"source"}           {"reached", "mean_distance", "max_distance"}
+    ancestor  {"node"}             earliest ancestor, -1 if no parents
+    ping      {}                   "pong"
+
+Failed queries get {"id": ..., "error": "message"} instead of a result.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Every project lives in its own directory and imports its neighbours by name
+HERE = os.path.dirname(os.path.abspath(__file__))
+for project in ('graph', 'social', 'ancestor'):
+    sys.path.append(os.path.join(HERE, '..', project))
+
+from graph import Graph
+from social import SocialGraph
+from ancestor import AncestryIndex
+from parallel import summarize_distances
+
+
+# Fields each operation needs
+REQUIRED = {'path': ('source', 'dest'), 'reach': ('source',), 'ancestor': ('node',), 'ping': ()}
+
+# Set in each worker by _init_worker
+_graph = None
+
+
+def _init_worker(graph):
+    global _graph
+    _graph = graph
+
+
+def _summarize(distances):
+    reached, mean_distance, max_distance = summarize_distances(distances)
+    return {'reached': reached, 'mean_distance': mean_distance, 'max_distance': max_distance}
+
+
+def run_query(graph, op, query):
+    """
+    Answer a path or reach query on a Graph or SocialGraph.
+    """
+    if op == 'path':
+        if isinstance(graph, SocialGraph):
+            return graph.get_shortest_path_tree(query['source']).get(query['dest'], [])
+        return graph.bfs(query['source'], query['dest'])
+    if op == 'reach':
+        if isinstance(graph, SocialGraph):
+            tree = graph.get_shortest_path_tree(query['source'])
+            return _summarize(tree.distance(user_id) for user_id in tree)
+        return _summarize(depth for _, depth, _ in
+                          graph.iter_bft(query['source'], include_info=True))
+    raise ValueError(f'Unknown operation {op!r}')
+
+
+def _worker_query(op, query):
+    return run_query(_graph, op, query)
+
+
+class QueryServer:
+
+    """
+    Answer queries from many clients at once.
+
+    Path and reach queries run in a pool of processes worker processes,
+    each holding its own copy of graph. With processes=0 they run in a
+    single background thread instead. Identical queries that arrive while
+    one is already running share its result rather than running again.
+    Ancestor queries are dictionary lookups, so they are answered directly.
+    """
+    def __init__(self, graph=None, ancestry=None, processes=None):
+        self.graph = graph
+        self.ancestry = ancestry
+        if processes == 0:
+            self.executor = ThreadPoolExecutor(1, initializer=_init_worker, initargs=(graph,))
+        else:
+            self.executor = ProcessPoolExecutor(processes, initializer=_init_worker,
+                                                initargs=(graph,))
+        # (op, query as JSON) -> future of the running query
+        self.in_flight = {}
+        self.queries_run = 0
+        self.queries_shared = 0
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=8765, unix_path=None):
+        if unix_path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_client, unix_path)
+        else:
+            self.server = await asyncio.start_server(self.handle_client, host, port)
+        return self.server
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(cancel_futures=True)
+
+    async def query(self, op, query):
+        """
+        Return the result of one query, or raise an exception.
+        """
+        if op not in REQUIRED:
+            raise ValueError(f'Unknown operation {op!r}')
+        for field in REQUIRED[op]:
+            if field not in query:
+                raise ValueError(f'{op} needs {field!r}')
+        if op == 'ping':
+            return 'pong'
+        if op == 'ancestor':
+            if self.ancestry is None:
+                raise ValueError('No ancestors loaded')
+            return self.ancestry.earliest_ancestor(query['node'])
+        if self.graph is None:
+            raise ValueError('No graph loaded')
+
+        key = (op, json.dumps(query, sort_keys=True))
+        future = self.in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, _worker_query, op, query)
+            self.in_flight[key] = future
+            future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+            self.queries_run += 1
+        else:
+            self.queries_shared += 1
+        # A client going away mustn't cancel a query others are waiting on
+        return await asyncio.shield(future)
+
+    async def _reply(self, request, writer, lock):
+        request_id = request.get('id')
+        try:
+            query = {key: value for key, value in request.items() if key not in ('id', 'op')}
+            reply = {'id': request_id, 'result': await self.query(request.get('op'), query)}
+        except KeyError as e:
+            # Graph and AncestryIndex raise 'Vertex X not found';
+            # SocialGraph raises the missing user ID itself
+            message = e.args[0]
+            if not isinstance(message, str):
+                message = f'User {message} not found'
+            reply = {'id': request_id, 'error': message}
+        except Exception as e:
+            reply = {'id': request_id, 'error': str(e)}
+        async with lock:
+            writer.write(json.dumps(reply).encode() + b'\n')
+            await writer.drain()
+
+    async def handle_client(self, reader, writer):
+        # Each request is answered in its own task, so a slow query doesn't
+        # hold up the ones behind it. The lock keeps replies from interleaving.
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError('Expected a JSON object')
+                except ValueError as e:
+                    reply = {'id': None, 'error': f'Bad request: {e}'}
+                    async with lock:
+                        writer.write(json.dumps(reply).encode() + b'\n')
+                    continue
+                task = asyncio.create_task(self._reply(request, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+
+def load_graph(args):
+    """
+    Return (graph, ancestry) as chosen on the command line.
+    """
+    graph = None
+    if args.edges:
+        graph = Graph.from_edge_list(args.edges)
+    elif args.social_edges:
+        graph = SocialGraph.from_edge_list(args.social_edges)
+    elif args.users:
+        graph = SocialGraph()
+        graph.populate_graph(args.users, args.avg_friendships, seed=args.seed)
+    ancestry = AncestryIndex(args.ancestors) if args.ancestors else None
+    return graph, ancestry
+
+
+async def serve(args):
+    graph, ancestry = load_graph(args)
+    server = QueryServer(graph, ancestry, processes=args.processes)
+    await server.start(args.host, args.port, args.unix)
+    where = args.unix or f'{args.host}:{args.port}'
+    print(f'Serving on {where}', file=sys.stderr)
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', help='listen on a Unix socket instead of TCP')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--edges', metavar='FILE', help='directed edge list to load as a Graph')
+    source.add_argument('--social-edges', metavar='FILE', help='friendship list to load as a SocialGraph')
+    source.add_argument('--users', type=int, help='generate a SocialGraph with this many users')
+    parser.add_argument('--avg-friendships', type=int, default=5)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--ancestors', metavar='FILE', help='(parent, child) list for ancestor queries')
+    parser.add_argument('--processes', type=int,
+                        help='worker processes (default: one per CPU; 0 for a single thread)')
+    args = parser.parse_args(argv)
+    if not (args.edges or args.social_edges or args.users or args.ancestors):
+        parser.error('nothing to serve: give --edges, --social-edges, --users or --ancestors')
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import unittest
+from server import QueryServer, Graph, SocialGraph, AncestryIndex
+
+
+def make_graph():
+    graph = Graph()
+    for vertex in range(1, 8):
+        graph.add_vertex(vertex)
+    for v1, v2 in [(5, 3), (6, 3), (7, 1), (4, 7), (1, 2), (7, 6),
+                   (2, 4), (3, 5), (2, 3), (4, 6)]:
+        graph.add_edge(v1, v2)
+    return graph
+
+
+class Test(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        ancestry = AncestryIndex([(1, 3), (2, 3), (3, 6), (5, 6), (5, 7), (4, 5),
+                                  (4, 8), (8, 9), (11, 8), (10, 1)])
+        self.server = QueryServer(make_graph(), ancestry, processes=0)
+        server = await self.server.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        await self.server.close()
+
+    async def ask(self, *requests):
+        for request in requests:
+            self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+        replies = {}
+        for _ in requests:
+            reply = json.loads(await self.reader.readline())
+            replies[reply['id']] = reply
+        return replies
+
+    async def test_queries(self):
+        replies = await self.ask({'id': 1, 'op': 'path', 'source': 1, 'dest': 6},
+                                 {'id': 2, 'op': 'reach', 'source': 1},
+                                 {'id': 3, 'op': 'ancestor', 'node': 6},
+                                 {'id': 4, 'op': 'ping'})
+        self.assertListEqual(replies[1]['result'], [1, 2, 4, 6])
+        self.assertEqual(replies[2]['result']['reached'], 6)
+        self.assertEqual(replies[2]['result']['max_distance'], 3)
+        self.assertEqual(replies[3]['result'], 10)
+        self.assertEqual(replies[4]['result'], 'pong')
+
+    async def test_errors(self):
+        replies = await self.ask({'id': 1, 'op': 'path', 'source': 99, 'dest': 1},
+                                 {'id': 2, 'op': 'path', 'source': 1},
+                                 {'id': 3, 'op': 'fly'})
+        self.assertEqual(replies[1]['error'], 'Vertex 99 not found')
+        self.assertIn('dest', replies[2]['error'])
+        self.assertIn('fly', replies[3]['error'])
+        self.writer.write(b'not json\n')
+        reply = json.loads(await self.reader.readline())
+        self.assertIsNone(reply['id'])
+        self.assertIn('Bad request', reply['error'])
+
+    async def test_coalescing(self):
+        results = await asyncio.gather(*(self.server.query('path', {'source': 1, 'dest': 6})
+                                         for _ in range(5)))
+        self.assertEqual(results, [[1, 2, 4, 6]] * 5)
+        self.assertEqual(self.server.queries_run, 1)
+        self.assertEqual(self.server.queries_shared, 4)
+        self.assertDictEqual(self.server.in_flight, {})
+
+
+class ProcessPoolTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_social_graph(self):
+        social_graph = SocialGraph()
+        social_graph.populate_graph(50, 3, seed=1)
+        paths = social_graph.get_all_social_paths(1)
+        server = QueryServer(social_graph, processes=1)
+        try:
+            for user_id in (1, 10, 50):
+                self.assertEqual(await server.query('path', {'source': 1, 'dest': user_id}),
+                                 paths.get(user_id, []))
+            reach = await server.query('reach', {'source': 1})
+            self.assertEqual(reach['reached'], len(paths) - 1)
+        finally:
+            await server.close()
+
+
+class LabelledTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_social_labels(self):
+        social_graph = SocialGraph.from_edge_list([('alice', 'bob'), ('bob', 'carol'), ('carol', 4)])
+        server = QueryServer(social_graph, processes=0)
+        try:
+            self.assertEqual(await server.query('path', {'source': 'alice', 'dest': 4}),
+                             ['alice', 'bob', 'carol', 4])
+            reach = await server.query('reach', {'source': 'alice'})
+            self.assertDictEqual(reach, {'reached': 3, 'mean_distance': 2.0, 'max_distance': 3})
+        finally:
+            await server.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,18 +1,153 @@
+import multiprocessing
 import random
 import sys
+from array import array
+from collections.abc import Mapping
 sys.path.append('../graph')
-from util import Queue
+from util import Queue, iter_edges
+from instrumentation import instrumented
+from cache import QueryCache
+
+
+# Set in each worker process of SocialGraph.get_network_stats
+_worker_adjacency = None
+
+
+def _init_worker(adjacency):
+    global _worker_adjacency
+    _worker_adjacency = adjacency
+
+
+def _worker_distance_counts(source_range):
+    return _distance_counts(_worker_adjacency, *source_range)
+
+
+def _distance_counts(adjacency, first, last):
+    """
+    Run a distance-only BFS from every source index in range(first, last)
+    at once, using one Python int per vertex as a bitset of sources.
+
+    Returns a list with one entry per vertex, where entry[d] is how many of
+    those sources are exactly d friendships away from that vertex.
+    """
+    num_vertices = len(adjacency)
+    # reach[v] has bit (s - first) set once source s has reached v.
+    # Friendships go both ways, so this is also the set of sources v reaches.
+    reach = [0] * num_vertices
+    counts = [[0] for _ in range(num_vertices)]
+    # Bits that were added to a vertex in the last round
+    new_bits = {}
+    for source in range(first, last):
+        reach[source] = 1 << (source - first)
+        counts[source][0] = 1
+        new_bits[source] = reach[source]
+
+    level = 0
+    while new_bits:
+        level += 1
+        # Only vertices next to one that changed can change this round
+        incoming = {}
+        for vertex, bits in new_bits.items():
+            for neighbor in adjacency[vertex]:
+                incoming[neighbor] = incoming.get(neighbor, 0) | bits
+        new_bits = {}
+        for vertex, bits in incoming.items():
+            bits &= ~reach[vertex]
+            if bits:
+                reach[vertex] |= bits
+                new_bits[vertex] = bits
+                vertex_counts = counts[vertex]
+                vertex_counts.extend([0] * (level - len(vertex_counts)))
+                vertex_counts.append(bits.bit_count())
+    return counts
 
 
 class User:
     def __init__(self, name):
         self.name = name
 
+class ShortestPathTree(Mapping):
+
+    """
+    Read-only mapping from every user in a user's extended network to the
+    shortest friendship path to them, like get_all_social_paths returns.
+
+    Only each user's distance and previous user on the path are stored,
+    in arrays indexed by user ID. Paths are built when they are looked up.
+
+    When some user IDs aren't integers (e.g. names read from a file), the
+    arrays are indexed by position in labels instead, and index maps each
+    user ID to its position.
+    """
+    def __init__(self, source, parents, distances, order, labels=None, index=None):
+        self.source = source
+        self.parents = parents      # previous user on the path, -1 if none
+        self.distances = distances  # friendships away, -1 if not reached
+        self.order = order          # reached users in breadth-first order
+        self.labels = labels
+        self.index = index
+
+    def _position(self, user_id):
+        # Where user_id is in the arrays, or -1
+        if self.index is not None:
+            return self.index.get(user_id, -1)
+        if isinstance(user_id, int) and 0 <= user_id < len(self.distances):
+            return user_id
+        return -1
+
+    def __contains__(self, user_id):
+        position = self._position(user_id)
+        return position >= 0 and self.distances[position] >= 0
+
+    def __getitem__(self, user_id):
+        position = self._position(user_id)
+        if position < 0 or self.distances[position] < 0:
+            raise KeyError(user_id)
+        path = [position]
+        while self.parents[position] >= 0:
+            position = self.parents[position]
+            path.append(position)
+        path.reverse()
+        if self.labels is not None:
+            path = [self.labels[position] for position in path]
+        return path
+
+    def __iter__(self):
+        if self.labels is not None:
+            labels = self.labels
+            return (labels[position] for position in self.order)
+        return iter(self.order)
+
+    def __len__(self):
+        return len(self.order)
+
+    def __sizeof__(self):
+        return (object.__sizeof__(self) + sys.getsizeof(self.parents)
+                + sys.getsizeof(self.distances) + sys.getsizeof(self.order))
+
+    def distance(self, user_id):
+        """
+        Number of friendships between the source and user_id.
+        """
+        position = self._position(user_id)
+        if position < 0 or self.distances[position] < 0:
+            raise KeyError(user_id)
+        return self.distances[position]
+
+
 class SocialGraph:
     def __init__(self):
         self.last_id = 0
         self.users = {}
         self.friendships = {}
+        # Bumped on every change to users or friendships, so cached
+        # results can tell when they are out of date
+        self.version = 0
+        self.path_cache = None
+        # True once a user ID that isn't a non-negative int has been added
+        self.has_labels = False
+        # (version, user IDs, {user ID: position}) for graphs with labels
+        self._label_index = None
 
     def add_friendship(self, user_id, friend_id):
         """
@@ -23,6 +158,7 @@ class SocialGraph:
         elif friend_id in self.friendships[user_id] or user_id in self.friendships[friend_id]:
             print("WARNING: Friendship already exists")
         else:
+            self.version += 1
             self.friendships[user_id].add(friend_id)
             self.friendships[friend_id].add(user_id)
 
@@ -30,11 +166,23 @@ class SocialGraph:
         """
         Create a new user with a sequential integer ID
         """
+        self.version += 1
         self.last_id += 1  # automatically increment the ID to assign the new user
         self.users[self.last_id] = User(name)
         self.friendships[self.last_id] = set()
 
-    def populate_graph(self, num_users, avg_friendships):
+    def _reset_users(self, num_users):
+        """
+        Replace the graph with num_users users and no friendships
+        """
+        self.version += 1
+        self.has_labels = False
+        self.last_id = num_users
+        self.users = {user_id: User(f'Fake user {user_id}')
+                      for user_id in range(1, num_users + 1)}
+        self.friendships = {user_id: set() for user_id in range(1, num_users + 1)}
+
+    def populate_graph(self, num_users, avg_friendships, seed=None):
         """
         Takes a number of users and an average number of friendships
         as arguments
@@ -43,31 +191,223 @@ class SocialGraph:
         between those users.
 
         The number of users must be greater than the average number of friendships.
+        Pass a seed to get the same graph every time.
         """
-        # Reset graph
-        self.last_id = 0
-        self.users = {}
-        self.friendships = {}
-        # !!!! IMPLEMENT ME 
-
-        # Add users
-        for i in range(num_users):
-            name = f'Fake user {i+1}'
-            self.add_user(name)
-        # Create friendships
-        possible_friendships = []
-        for i in range(1, num_users+1):
-            for j in range(1, num_users+1):
-                if i < j:
-                    possible_friendships.append((i,j))
-        
-        random.shuffle(possible_friendships)
+        if avg_friendships >= num_users > 0:
+            raise ValueError('The number of users must be greater than the average number of friendships')
+        rng = random.Random(seed)
+        self._reset_users(num_users)
+
+        num_friendships = num_users * avg_friendships // 2
+        friendships = self.friendships
+        max_friendships = num_users * (num_users - 1) // 2
+        if num_friendships > max_friendships // 2:
+            # Dense graph: the possible pairs aren't many more than
+            # the friendships, so pick from the full list.
+            possible_friendships = [(i, j) for i in range(1, num_users + 1)
+                                    for j in range(i + 1, num_users + 1)]
+            for user_id, friend_id in rng.sample(possible_friendships, num_friendships):
+                friendships[user_id].add(friend_id)
+                friendships[friend_id].add(user_id)
+            return
+
+        # Sparse graph: rather than listing and shuffling every possible
+        # pair, keep drawing random pairs until we have enough distinct
+        # ones. Fewer than half of all pairs are needed, so on average
+        # this takes fewer than two draws per friendship.
+        draw = rng.random
+        added = 0
+        while added < num_friendships:
+            user_id = int(draw() * num_users) + 1
+            friend_id = int(draw() * num_users) + 1
+            if user_id != friend_id and friend_id not in friendships[user_id]:
+                friendships[user_id].add(friend_id)
+                friendships[friend_id].add(user_id)
+                added += 1
+
+    def _add_friendships(self, pairs):
+        """
+        Add many bi-directional friendships at once.
+
+        Unlike add_friendship, this doesn't check or warn about anything:
+        self-friendships are skipped and repeats are absorbed by the sets.
+        """
+        self.version += 1
+        friendships = self.friendships
+        for user_id, friend_id in pairs:
+            if user_id != friend_id:
+                friendships[user_id].add(friend_id)
+                friendships[friend_id].add(user_id)
+
+    def add_friendships_from(self, pairs):
+        """
+        Add many bi-directional friendships at once, creating users for
+        any IDs that don't exist yet.
+
+        pairs can be an iterable of (user_id, friend_id) pairs, an N x 2
+        NumPy array, or the path of an edge list file (see util.iter_edges).
+        Self-friendships and repeats are silently skipped.
+        """
+        self.version += 1
+        users = self.users
+        friendships = self.friendships
+        # One pass, so the pairs can be streamed from a file of any size
+        for user_id, friend_id in iter_edges(pairs):
+            for new_id in (user_id, friend_id):
+                if new_id not in friendships:
+                    users[new_id] = User(f'User {new_id}')
+                    friendships[new_id] = set()
+                    # Labels read from files can be strings; only integer
+                    # IDs take part in add_user's numbering
+                    if not isinstance(new_id, int) or new_id < 0:
+                        self.has_labels = True
+                    elif new_id > self.last_id:
+                        self.last_id = new_id
+            if user_id != friend_id:
+                friendships[user_id].add(friend_id)
+                friendships[friend_id].add(user_id)
+
+    @classmethod
+    def from_edge_list(cls, pairs):
+        """
+        Make a new SocialGraph from friendships, in any form
+        add_friendships_from accepts.
+        """
+        social_graph = cls()
+        social_graph.add_friendships_from(pairs)
+        return social_graph
+
+    def populate_preferential_attachment(self, num_users, friendships_per_user, seed=None):
+        """
+        Creates num_users users using the Barabasi-Albert model.
+
+        Users join one at a time and befriend friendships_per_user existing
+        users, picked with probability proportional to how many friends they
+        already have. This gives a few very popular "hub" users, like real
+        social networks have.
+        """
+        if not 0 < friendships_per_user < num_users:
+            raise ValueError('friendships_per_user must be between 0 and the number of users')
+        rng = random.Random(seed)
+        self._reset_users(num_users)
+
+        # Every user appears in this list once per friend they have,
+        # so a uniform pick from it is a pick proportional to degree.
+        endpoints = []
+        pairs = []
+        # The first new user befriends all of the initial users
+        targets = range(1, friendships_per_user + 1)
+        for user_id in range(friendships_per_user + 1, num_users + 1):
+            for friend_id in targets:
+                pairs.append((user_id, friend_id))
+                endpoints.append(user_id)
+                endpoints.append(friend_id)
+            targets = set()
+            while len(targets) < friendships_per_user:
+                targets.add(endpoints[int(rng.random() * len(endpoints))])
+        self._add_friendships(pairs)
+
+    def populate_communities(self, num_users, num_communities, avg_friendships,
+                             outside_fraction=0.1, seed=None):
+        """
+        Creates num_users users split into num_communities communities of
+        consecutive IDs (a stochastic block model).
+
+        About outside_fraction of the friendships link users in different
+        communities; the rest stay inside one community.
+        """
+        if not 0 < num_communities <= num_users:
+            raise ValueError('num_communities must be between 1 and the number of users')
+        community_size = num_users // num_communities
+        if avg_friendships >= community_size:
+            raise ValueError('Each community must have more users than the average number of friendships')
+        rng = random.Random(seed)
+        self._reset_users(num_users)
+
         num_friendships = num_users * avg_friendships // 2
-        for i in range(num_friendships):
-            friendship = possible_friendships[i]
-            self.add_friendship(friendship[0], friendship[1])
+        draw = rng.random
+        pairs = set()
+        while len(pairs) < num_friendships:
+            if draw() < outside_fraction:
+                user_id = int(draw() * num_users)
+                friend_id = int(draw() * num_users)
+            else:
+                # Users past the last full community join the last one
+                community = int(draw() * num_communities)
+                first = community * community_size
+                size = num_users - first if community == num_communities - 1 else community_size
+                user_id = first + int(draw() * size)
+                friend_id = first + int(draw() * size)
+            if user_id < friend_id:
+                pairs.add((user_id + 1, friend_id + 1))
+            elif friend_id < user_id:
+                pairs.add((friend_id + 1, user_id + 1))
+        self._add_friendships(pairs)
+
+    def populate_small_world(self, num_users, avg_friendships, rewire_probability=0.1, seed=None):
+        """
+        Creates num_users users using the Watts-Strogatz model.
+
+        Users start in a ring, each friends with the avg_friendships // 2
+        closest users on either side. Then each friendship is moved to a
+        random user with probability rewire_probability, which adds the
+        shortcuts that make the world "small".
+
+        There are num_users * (avg_friendships // 2) friendships in total,
+        unless that is nearly every possible pair and some rewired
+        friendship finds its user already friends with everyone.
+        """
+        half = avg_friendships // 2
+        if not 0 < half * 2 < num_users:
+            raise ValueError('avg_friendships must be at least 2 and less than the number of users')
+        rng = random.Random(seed)
+        self._reset_users(num_users)
+
+        draw = rng.random
+        pairs = set()
+
+        def free_pair(user_id):
+            # A few random draws almost always find someone new; if they
+            # don't, the user is nearly everyone's friend, so check everyone
+            for _ in range(32):
+                friend_id = int(draw() * num_users) + 1
+                pair = (min(user_id, friend_id), max(user_id, friend_id))
+                if friend_id != user_id and pair not in pairs:
+                    return pair
+            first = int(draw() * num_users)
+            for i in range(num_users):
+                friend_id = (first + i) % num_users + 1
+                pair = (min(user_id, friend_id), max(user_id, friend_id))
+                if friend_id != user_id and pair not in pairs:
+                    return pair
+            return None
+
+        for user_id in range(1, num_users + 1):
+            for offset in range(1, half + 1):
+                friend_id = (user_id + offset - 1) % num_users + 1
+                pair = (min(user_id, friend_id), max(user_id, friend_id))
+                # A ring friendship an earlier rewire already made
+                # gets moved too, so no friendship is lost
+                if draw() < rewire_probability or pair in pairs:
+                    pair = free_pair(user_id)
+                    if pair is None:
+                        # Already friends with everyone
+                        continue
+                pairs.add(pair)
+        self._add_friendships(pairs)
 
-    def get_all_social_paths(self, user_id):
+    def enable_path_cache(self, max_bytes=64 * 2 ** 20):
+        """
+        Cache the results of get_all_social_paths, using up to about
+        max_bytes of memory.
+
+        Any change made through this class's methods invalidates the
+        cache; changing self.friendships directly does not.
+        """
+        self.path_cache = QueryCache(max_bytes)
+
+    @instrumented('SocialGraph.get_all_social_paths')
+    def get_all_social_paths(self, user_id, _stats=None):
         """
         Takes a user's user_id as an argument
 
@@ -75,7 +415,20 @@ class SocialGraph:
         extended network with the shortest friendship path between them.
 
         The key is the friend's ID and the value is the path.
+
+        With the path cache enabled, the paths in the result are shared
+        with the cache and must not be modified.
         """
+        if self.path_cache is None:
+            return self._get_all_social_paths(user_id, _stats)
+        key = ('paths', user_id)
+        paths = self.path_cache.get(key, self.version)
+        if paths is None:
+            paths = self._get_all_social_paths(user_id, _stats)
+            self.path_cache.put(key, paths, self.version)
+        return dict(paths)
+
+    def _get_all_social_paths(self, user_id, _stats=None):
         visited = {}  # Note that this is a dictionary, not a set
         # !!!! IMPLEMENT ME
         queue = Queue()
@@ -93,10 +446,138 @@ class SocialGraph:
                     #print('New path:', new_path)
                     queue.enqueue(new_path)
                     #print('Queue:', queue.queue)
+                    if _stats is not None:
+                        _stats.path_copies += 1
+            if _stats is not None:
+                _stats.expand(len(self.friendships[current_node]), queue.size())
             current_path = queue.dequeue()
 
         return visited
 
+    @instrumented('SocialGraph.get_shortest_path_tree')
+    def get_shortest_path_tree(self, user_id, _stats=None):
+        """
+        Same result as get_all_social_paths, as a ShortestPathTree.
+
+        It takes a few bytes per user instead of a list per user in the
+        network, and each path is only built when it is looked up.
+        """
+        if self.path_cache is not None:
+            key = ('tree', user_id)
+            tree = self.path_cache.get(key, self.version)
+            if tree is None:
+                tree = self._get_shortest_path_tree(user_id, _stats)
+                self.path_cache.put(key, tree, self.version)
+            # Trees are read-only, so they can be shared
+            return tree
+        return self._get_shortest_path_tree(user_id, _stats)
+
+    def _get_shortest_path_tree(self, user_id, _stats=None):
+        friendships = self.friendships
+        if user_id not in friendships:
+            raise KeyError(user_id)
+        # Size the arrays from the IDs actually in the graph, since
+        # friendships may have been filled in without going through
+        # add_user or add_friendships_from
+        if self.has_labels or not all(type(friend_id) is int for friend_id in friendships):
+            return self._get_labelled_path_tree(user_id, _stats)
+        if min(friendships) < 0:
+            return self._get_labelled_path_tree(user_id, _stats)
+        size = max(friendships) + 1
+        parents = array('l', [-1]) * size
+        distances = array('l', [-1]) * size
+        distances[user_id] = 0
+        # The users in breadth-first order double as the queue
+        order = array('l', [user_id])
+        next_index = 0
+        while next_index < len(order):
+            current_node = order[next_index]
+            next_index += 1
+            distance = distances[current_node] + 1
+            for neighbor in friendships[current_node]:
+                if distances[neighbor] < 0:
+                    distances[neighbor] = distance
+                    parents[neighbor] = current_node
+                    order.append(neighbor)
+            if _stats is not None:
+                _stats.expand(len(friendships[current_node]), len(order) - next_index)
+        return ShortestPathTree(user_id, parents, distances, order)
+
+    def _get_labelled_path_tree(self, user_id, _stats=None):
+        # Same search as above, over positions in a list of the user IDs.
+        # When the IDs came in through add_friendships_from, the list and
+        # index are shared by every tree until the version changes. Direct
+        # changes to friendships don't change the version, so otherwise
+        # they are rebuilt every time.
+        cached = self._label_index
+        if self.has_labels and cached is not None and cached[0] == self.version:
+            _, labels, index = cached
+        else:
+            labels = list(self.friendships)
+            index = {label: position for position, label in enumerate(labels)}
+            if self.has_labels:
+                self._label_index = (self.version, labels, index)
+        friendships = self.friendships
+        parents = array('l', [-1]) * len(labels)
+        distances = array('l', [-1]) * len(labels)
+        source = index[user_id]
+        distances[source] = 0
+        order = array('l', [source])
+        next_index = 0
+        while next_index < len(order):
+            current_node = order[next_index]
+            next_index += 1
+            distance = distances[current_node] + 1
+            friends = friendships[labels[current_node]]
+            for friend_id in friends:
+                neighbor = index[friend_id]
+                if distances[neighbor] < 0:
+                    distances[neighbor] = distance
+                    parents[neighbor] = current_node
+                    order.append(neighbor)
+            if _stats is not None:
+                _stats.expand(len(friends), len(order) - next_index)
+        return ShortestPathTree(user_id, parents, distances, order, labels, index)
+
+    def get_network_stats(self, chunk_size=4096, processes=None):
+        """
+        Computes the degrees of separation between every pair of users
+        without building any paths.
+
+        Returns a dictionary mapping each user's ID to a list where
+        entry d is the number of users exactly d friendships away.
+        Entry 0 is always 1 (the user themself), so the sum of the list
+        is the size of the user's extended network including themself.
+
+        Sources are processed chunk_size at a time as bitsets. If processes
+        is given, the chunks are spread over a pool of that many processes.
+        """
+        user_ids = list(self.friendships)
+        index = {user_id: i for i, user_id in enumerate(user_ids)}
+        adjacency = [[index[friend_id] for friend_id in self.friendships[user_id]]
+                     for user_id in user_ids]
+        source_ranges = [(first, min(first + chunk_size, len(user_ids)))
+                         for first in range(0, len(user_ids), chunk_size)]
+
+        if processes is None:
+            results = (_distance_counts(adjacency, first, last)
+                       for first, last in source_ranges)
+            return self._merge_distance_counts(user_ids, results)
+        with multiprocessing.Pool(processes, initializer=_init_worker,
+                                  initargs=(adjacency,)) as pool:
+            results = pool.imap_unordered(_worker_distance_counts, source_ranges)
+            return self._merge_distance_counts(user_ids, results)
+
+    def _merge_distance_counts(self, user_ids, results):
+        histograms = [[] for _ in user_ids]
+        for counts in results:
+            for histogram, vertex_counts in zip(histograms, counts):
+                if len(histogram) < len(vertex_counts):
+                    histogram.extend([0] * (len(vertex_counts) - len(histogram)))
+                for distance, count in enumerate(vertex_counts):
+                    histogram[distance] += count
+        return dict(zip(user_ids, histograms))
+
 
 """
 Answers to questions--
@@ -129,6 +610,9 @@ For more realistic results, one method is to pre-divide the ID numbers into grou
 friendships between user IDs in the same group. Or we could keep track of how many users are in
 each person's extended network as we add friendships, and refuse to add any more friendships for
 that user once they hit a certain number. (This number can be varied from user to user.)
+
+The first idea is what populate_communities does. populate_small_world and
+populate_preferential_attachment are two other well-known, more realistic models.
 """
 
 if __name__ == '__main__':
@@ -148,12 +632,14 @@ if __name__ == '__main__':
         degree_of_sep_sum = 0
         degree_of_sep_length = 0
         sg.populate_graph(1000, 5)
-        for user in range(1, 1001):
-            network = sg.get_all_social_paths(user)
-            friends_sum += len(network)
-            for friend in network.keys():
-                degree_of_sep_sum += len(network[friend])
-                degree_of_sep_length += 1
+        for histogram in sg.get_network_stats().values():
+            # Same numbers as counting the paths from get_all_social_paths:
+            # the network includes the user, and a path to someone d
+            # friendships away has d + 1 entries.
+            friends_sum += sum(histogram)
+            for distance, count in enumerate(histogram):
+                degree_of_sep_sum += (distance + 1) * count
+                degree_of_sep_length += count
         
         friends_means.append(friends_sum / 1000)
         degree_of_sep_means.append(degree_of_sep_sum / degree_of_sep_length)
@@ -0,0 +1,136 @@
+import os
+import tempfile
+import unittest
+from social import SocialGraph
+
+
+def count_friendships(graph):
+    return sum(len(friends) for friends in graph.friendships.values()) // 2
+
+
+def histogram_from_paths(paths):
+    """Count the users at each distance from get_all_social_paths' result."""
+    histogram = []
+    for path in paths.values():
+        distance = len(path) - 1
+        histogram.extend([0] * (distance + 1 - len(histogram)))
+        histogram[distance] += 1
+    return histogram
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = SocialGraph()
+        self.graph.populate_graph(200, 3, seed=1)
+
+    def test_network_stats(self):
+        # Small chunks, so sources are spread over several bitset chunks
+        stats = self.graph.get_network_stats(chunk_size=64)
+        self.assertEqual(len(stats), 200)
+        for user_id, histogram in stats.items():
+            self.assertListEqual(histogram,
+                                 histogram_from_paths(self.graph.get_all_social_paths(user_id)))
+
+    def test_network_stats_processes(self):
+        self.assertDictEqual(self.graph.get_network_stats(chunk_size=32, processes=2),
+                             self.graph.get_network_stats())
+
+    def test_populate_graph(self):
+        other = SocialGraph()
+        other.populate_graph(200, 3, seed=1)
+        self.assertDictEqual(other.friendships, self.graph.friendships)
+        other.populate_graph(200, 3, seed=2)
+        self.assertNotEqual(other.friendships, self.graph.friendships)
+        self.assertEqual(count_friendships(self.graph), 200 * 3 // 2)
+        self.assertEqual(len(self.graph.users), 200)
+        for user_id, friends in self.graph.friendships.items():
+            self.assertNotIn(user_id, friends)
+            for friend_id in friends:
+                self.assertIn(user_id, self.graph.friendships[friend_id])
+
+    def test_populate_graph_dense(self):
+        # Nearly every possible pair, so the whole list is sampled from
+        self.graph.populate_graph(10, 8, seed=1)
+        self.assertEqual(count_friendships(self.graph), 40)
+        self.graph.populate_graph(10, 9, seed=1)
+        self.assertEqual(count_friendships(self.graph), 45)
+
+    def test_populate_graph_invalid(self):
+        self.assertRaises(ValueError, self.graph.populate_graph, 10, 10)
+        self.assertRaises(ValueError, self.graph.populate_graph, 5, 8)
+
+    def test_preferential_attachment(self):
+        self.graph.populate_preferential_attachment(300, 3, seed=1)
+        self.assertEqual(count_friendships(self.graph), (300 - 3) * 3)
+        # Hubs: the most popular user has far more friends than average
+        self.assertGreater(max(len(friends) for friends in self.graph.friendships.values()), 20)
+        self.assertRaises(ValueError, self.graph.populate_preferential_attachment, 3, 3)
+
+    def test_communities(self):
+        self.graph.populate_communities(300, 5, 4, outside_fraction=0.1, seed=1)
+        self.assertEqual(count_friendships(self.graph), 300 * 4 // 2)
+        outside = sum(1 for user_id, friends in self.graph.friendships.items()
+                      for friend_id in friends if (user_id - 1) // 60 != (friend_id - 1) // 60)
+        self.assertLess(outside / 2, 300 * 4 // 2 * 0.2)
+        # Communities with barely more users than friendships still finish
+        self.graph.populate_communities(20, 4, 4, outside_fraction=0.0, seed=1)
+        self.assertEqual(count_friendships(self.graph), 40)
+        self.assertRaises(ValueError, self.graph.populate_communities, 20, 5, 4)
+
+    def test_small_world(self):
+        self.graph.populate_small_world(1000, 6, 0.2, seed=1)
+        self.assertEqual(count_friendships(self.graph), 3000)
+        self.graph.populate_small_world(100, 4, 0.0, seed=1)
+        self.assertEqual(count_friendships(self.graph), 200)
+        self.assertSetEqual(self.graph.friendships[1], {2, 3, 99, 100})
+        # Every pair is a friendship, so rewiring runs out of new friends
+        for seed in range(7):
+            self.graph.populate_small_world(5, 4, 1.0, seed=seed)
+            self.assertLessEqual(count_friendships(self.graph), 10)
+        self.assertRaises(ValueError, self.graph.populate_small_world, 4, 4)
+
+    def test_shortest_path_tree(self):
+        for user_id in (1, 57, 200):
+            paths = self.graph.get_all_social_paths(user_id)
+            tree = self.graph.get_shortest_path_tree(user_id)
+            self.assertEqual(len(tree), len(paths))
+            # Same users, in the same breadth-first order, with the same paths
+            self.assertListEqual(list(tree), list(paths))
+            for friend_id, path in paths.items():
+                self.assertListEqual(tree[friend_id], path)
+                self.assertEqual(tree.distance(friend_id), len(path) - 1)
+        tree = self.graph.get_shortest_path_tree(1)
+        self.assertNotIn(0, tree)
+        self.assertNotIn(-1, tree)
+        self.assertNotIn('1', tree)
+        self.assertRaises(KeyError, tree.__getitem__, 201)
+        self.assertRaises(KeyError, self.graph.get_shortest_path_tree, 201)
+
+    def test_shortest_path_tree_labels(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('alice,bob\nbob,carol\ncarol,3\n3,7\ndave,erin\n')
+        try:
+            graph = SocialGraph.from_edge_list(f.name)
+        finally:
+            os.remove(f.name)
+        self.assertEqual(graph.last_id, 7)
+        tree = graph.get_shortest_path_tree('alice')
+        self.assertDictEqual(dict(tree), graph.get_all_social_paths('alice'))
+        self.assertListEqual(tree[7], ['alice', 'bob', 'carol', 3, 7])
+        self.assertNotIn('dave', tree)
+
+    def test_shortest_path_tree_direct_friendships(self):
+        # Friendships set directly, as in social.py's __main__
+        graph = SocialGraph()
+        graph.friendships = {1: {2}, 2: {1, 3}, 3: {2}}
+        tree = graph.get_shortest_path_tree(1)
+        self.assertDictEqual(dict(tree), graph.get_all_social_paths(1))
+        graph.friendships = {'a': {'b'}, 'b': {'a', -1}, -1: {'b'}}
+        self.assertDictEqual(dict(graph.get_shortest_path_tree('a')), graph.get_all_social_paths('a'))
+        graph.friendships = {'x': {'y'}, 'y': {'x'}}
+        self.assertListEqual(graph.get_shortest_path_tree('x')['y'], ['x', 'y'])
+
+
+if __name__ == '__main__':
+    unittest.main()